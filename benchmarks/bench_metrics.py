@@ -0,0 +1,232 @@
+"""Offline benchmarks for the simulators, statistics and plot rendering.
+
+Each benchmark is timed with a few repeats and the results are written
+as JSON (one file per run, tagged with the git commit) so two runs can be
+compared:
+
+	python ./benchmarks/bench_metrics.py --output before.json
+	python ./benchmarks/bench_metrics.py --output after.json --compare before.json
+
+`--quick` caps the window counts and series lengths for a fast smoke run,
+`--filter` keeps only benchmarks whose name contains the given text.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import metrics_demo as md  # noqa: E402
+
+
+VOLUMES = (100, 10_000, 1_000_000)
+WINDOW_COUNTS = (40, 1_000, 100_000, 1_000_000)
+STEP_COUNTS = (4, 20)
+SERIES_LENGTHS = (1_000, 100_000, 1_000_000)
+QUICK_MAX_WINDOWS = 1_000
+# User-level simulation draws one event per user, so keep users × windows bounded
+MAX_USER_EVENTS = 20_000_000
+
+
+def time_call(func: Callable[[], object], min_time: float = 0.2, max_repeat: int = 20) -> Dict[str, float]:
+	"""Call `func` until `min_time` has elapsed (at least 3 times, at most `max_repeat`)."""
+	timings: List[float] = []
+	total = 0.0
+	while len(timings) < 3 or (total < min_time and len(timings) < max_repeat):
+		start = time.perf_counter()
+		func()
+		elapsed = time.perf_counter() - start
+		timings.append(elapsed)
+		total += elapsed
+	return {
+		"repeat": len(timings),
+		"best": min(timings),
+		"median": float(np.median(timings)),
+	}
+
+
+def flow(volume: int, steps: int, name: str = "bench") -> md.FlowScenario:
+	"""A flow with `steps` - 1 transitions of 0.95 and a final pass-through."""
+	return md.FlowScenario(name=name, A1=volume, transitions=[0.95] * (steps - 2) + [1.0])
+
+
+def simulator_benchmarks(quick: bool) -> Dict[str, Callable[[], object]]:
+	benches: Dict[str, Callable[[], object]] = {}
+	windows_grid = [w for w in WINDOW_COUNTS if not quick or w <= QUICK_MAX_WINDOWS]
+	for volume, windows, steps in itertools.product(VOLUMES, windows_grid, STEP_COUNTS):
+		base = flow(volume, steps)
+		test = md.FlowScenario(name="drop", A1=volume, transitions=[0.95, 0.8] + base.transitions[2:])
+		half = windows // 2
+		for sampling in md.SAMPLING_MODES:
+			sim = md.SimulationScenario("bench", base, half, test, windows - half, jitter=0.02, sampling=sampling)
+			benches[f"SimulationScenario.simulate[{sampling},A1={volume},W={windows},S={steps}]"] = (
+				lambda sim=sim: sim.simulate(0)
+			)
+		seasonal = md.SeasonalSimulation(
+			"bench", base, half, test, windows - half, min_volume=max(1, volume // 20), max_volume=volume
+		)
+		benches[f"SeasonalSimulation.simulate[A1={volume},W={windows},S={steps}]"] = lambda sim=seasonal: sim.simulate(0)
+		retry = md.SimulationScenario(
+			"bench", md.FlowScenario("retry", volume, base.transitions, max_retries=3), windows, base, 0, retry_spill=0.1
+		)
+		benches[f"SimulationScenario.simulate[retries=3,A1={volume},W={windows},S={steps}]"] = lambda sim=retry: sim.simulate(0)
+		if volume * windows <= MAX_USER_EVENTS:
+			benches[f"simulate_windowed_counts[users={volume},W={windows},S={steps}]"] = (
+				lambda volume=volume, windows=windows, steps=steps: md.simulate_windowed_counts(
+					volume, windows, [0.95] * (steps - 1), 0.5, rng=0
+				)
+			)
+	return benches
+
+
+def statistics_benchmarks(quick: bool) -> Dict[str, Callable[[], object]]:
+	benches: Dict[str, Callable[[], object]] = {}
+	rng = np.random.default_rng(0)
+	for length in SERIES_LENGTHS:
+		if quick and length > 100_000:
+			continue
+		series = 0.7 + 0.01 * rng.standard_normal(length)
+		series_list = series.tolist()
+		trials = rng.integers(100, 10_000, length)
+		successes = rng.binomial(trials, 0.7)
+		arrivals = np.stack([trials, successes], axis=-1)
+		benches[f"compute_moving_average[N={length},ma=5]"] = lambda s=series_list: md.compute_moving_average(s, 5)
+		benches[f"rolling_mean[N={length},ma=15]"] = lambda s=series: md.rolling_mean(s, 15)
+		benches[f"rolling_control_limits[N={length}]"] = lambda s=series: md.rolling_control_limits(s, 10)
+		benches[f"compute_individuals_control_limits[N={length}]"] = (
+			lambda s=series_list: md.compute_individuals_control_limits(s, len(s) // 2)
+		)
+		benches[f"compute_p_chart_limits[N={length}]"] = (
+			lambda x=successes, n=trials: md.compute_p_chart_limits(x, n, len(n) // 2)
+		)
+		benches[f"attribute_transitions[N={length}]"] = lambda a=arrivals: md.attribute_transitions(a, len(a) // 2)
+		for method in md.DETECTOR_METHODS:
+			benches[f"detect_changes[{method},N={length}]"] = (
+				lambda s=series, m=method: md.detect_changes(s, len(s) // 2, m)
+			)
+		if length <= 100_000:
+			# Streaming chart is per value by design, so skip the longest series
+			benches[f"RollingControlChart.update[N={length}]"] = lambda s=series_list: _stream_chart(s)
+	return benches
+
+
+def _stream_chart(series: List[float]) -> None:
+	chart = md.RollingControlChart(ma_window=5)
+	for value in series:
+		chart.update(value)
+
+
+def render_benchmarks(output_dir: str) -> Dict[str, Callable[[], object]]:
+	normal = md.FlowScenario("Normal", 1000, [0.9, 0.9, 0.9, 1.0])
+	drop = md.FlowScenario("Drop", 1000, [0.9, 0.2, 0.9, 1.0])
+	high = md.FlowScenario("High", 1_000_000, [0.9, 0.9, 0.9, 1.0])
+	sim = md.SimulationScenario("Failure", high, 40, drop, 40, jitter=0.05)
+	seasonal = md.SeasonalSimulation("Seasonal", high, 96, drop, 48, min_volume=50_000, max_volume=1_000_000)
+
+	def path(name: str) -> str:
+		return os.path.join(output_dir, name)
+
+	return {
+		"render.plot1_arrivals": lambda: md.plot1_arrivals(normal, drop, path("plot1.png")),
+		"render.plot4_transition_ratios": lambda: md.plot4_transition_ratios(normal, drop, path("plot4.png")),
+		"render.plot5_conversion": lambda: md.plot5_conversion(normal, drop, path("plot5.png")),
+		"render.plot_C_with_limits": lambda: md.plot_C_with_limits(sim, path("plot7.png"), highlight_test_phase=True),
+		"render.plot_C_with_moving_average_limits": (
+			lambda: md.plot_C_with_moving_average_limits(sim, 5, path("plot15.png"), highlight_test_phase=True)
+		),
+		"render.plot_seasonal_volume_and_C": lambda: md.plot_seasonal_volume_and_C(seasonal, 5, path("seasonal.png")),
+		"render.plot_seasonal_C_with_ma": (
+			lambda: md.plot_seasonal_C_with_ma(seasonal, 5, path("plot18.png"), volume_aware=True)
+		),
+		"render.plot8_timing_noise": lambda: md.plot8_timing_noise(0.9, path("plot8.png")),
+		"render.plot9_steps_effect": lambda: md.plot9_steps_effect(filename=path("plot9.png")),
+	}
+
+
+def git_commit() -> str | None:
+	try:
+		return subprocess.run(
+			["git", "rev-parse", "--short", "HEAD"],
+			capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def compare(results: List[dict], baseline_path: str, threshold: float) -> int:
+	"""Print per-benchmark speed ratios against `baseline_path`; return the number of regressions."""
+	with open(baseline_path) as f:
+		baseline = {r["name"]: r for r in json.load(f)["results"]}
+	regressions = 0
+	for result in results:
+		old = baseline.get(result["name"])
+		if old is None:
+			continue
+		ratio = result["best"] / old["best"]
+		marker = ""
+		if ratio > 1.0 + threshold:
+			marker = "  SLOWER"
+			regressions += 1
+		elif ratio < 1.0 - threshold:
+			marker = "  faster"
+		print(f"{ratio:6.2f}x  {result['name']}{marker}")
+	return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--output", default="bench_results.json", help="JSON file to write results to")
+	parser.add_argument("--compare", help="Earlier JSON results to compare against")
+	parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression")
+	parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+	parser.add_argument("--quick", action="store_true", help="Cap window counts and series lengths")
+	parser.add_argument("--min-time", type=float, default=0.2, help="Minimum total seconds per benchmark")
+	args = parser.parse_args(argv)
+
+	with tempfile.TemporaryDirectory() as output_dir:
+		benches = {
+			**simulator_benchmarks(args.quick),
+			**statistics_benchmarks(args.quick),
+			**render_benchmarks(output_dir),
+		}
+		results = []
+		for name, func in benches.items():
+			if args.filter not in name:
+				continue
+			result = {"name": name, **time_call(func, args.min_time)}
+			results.append(result)
+			print(f"{result['best'] * 1e3:12.3f} ms  {name}", flush=True)
+
+	report = {
+		"commit": git_commit(),
+		"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"matplotlib": matplotlib.__version__,
+		"machine": platform.machine(),
+		"cpu_count": os.cpu_count(),
+		"quick": args.quick,
+		"results": results,
+	}
+	with open(args.output, "w") as f:
+		json.dump(report, f, indent=1)
+	if args.compare:
+		return 1 if compare(results, args.compare, args.threshold) else 0
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
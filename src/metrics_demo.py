@@ -1,10 +1,24 @@
 import matplotlib.pyplot as plt
 import numpy as np
+import asyncio
 import os
+import hashlib
+import inspect
+import json
+import sys
+import threading
+import time
+import typing
+import zlib
 import random
+import struct
 import math
-from dataclasses import dataclass
-from typing import List, Tuple
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
 
 
 @dataclass
@@ -16,7 +30,10 @@ class FlowScenario:
 	arrivals that satisfy the algebra in the README:
 		A_{i+1}(t) ≈ T_i(t) · A_i(t).
 	If `max_retries > 0`, we treat retries at each step using a simple
-	expected-attempts factor when computing arrivals.
+	expected-attempts factor when computing arrivals: T_i stays the net
+	share of users passing step i and retries only inflate its requests.
+	The simulators draw retries with the same expectation (see
+	`simulate_retry_counts`).
 	"""
 	name: str
 	A1: int
@@ -197,6 +214,487 @@ def plot5_conversion(flow_a: FlowScenario, flow_b: FlowScenario, filename: str =
 	plt.savefig(filename, dpi=150)
 	plt.close()
 
+
+def default_rng() -> np.random.Generator:
+	"""Generator used when a simulator is not given one explicitly.
+
+	It is seeded from the module-level `random` state, so `random.seed(...)`
+	still makes a whole run reproducible.
+	"""
+	return np.random.default_rng(random.getrandbits(128))
+
+
+def as_rng(seed: np.random.Generator | np.random.SeedSequence | int | None = None) -> np.random.Generator:
+	"""Turn anything the simulators accept as `rng` into a Generator.
+
+	A Generator is used as is, an int or `SeedSequence` seeds a fresh one
+	and None falls back to `default_rng()`.
+	"""
+	if seed is None:
+		return default_rng()
+	if isinstance(seed, np.random.Generator):
+		return seed
+	return np.random.default_rng(seed)
+
+
+def spawn_seeds(seed: np.random.SeedSequence | int | None, n: int) -> List[np.random.SeedSequence]:
+	"""Independent child streams for `n` scenarios, replicates or workers.
+
+	Children come from `numpy.random.SeedSequence.spawn`, so the i-th
+	stream depends only on `seed` and i, never on which process or thread
+	consumes it. A None seed draws fresh entropy from the `random` module
+	(see `default_rng`).
+	"""
+	if seed is None:
+		seed = random.getrandbits(128)
+	if not isinstance(seed, np.random.SeedSequence):
+		seed = np.random.SeedSequence(seed)
+	return seed.spawn(n)
+
+
+def stack_flow_phases(phases: List[Tuple[FlowScenario, int]]) -> Tuple[np.ndarray, np.ndarray]:
+	"""Lay out consecutive flow phases as per-window arrays.
+
+	Each `(flow, length)` pair contributes `length` windows. Returns the
+	per-window A1 vector and a (windows × steps) matrix of nominal T_i.
+	Flows with fewer transitions are right-padded with NaN, which
+	`simulate_step_counts` treats as a pass-through step.
+	"""
+	steps = max((len(flow.transitions) for flow, _ in phases), default=0)
+	A1_parts = []
+	T_parts = []
+	for flow, length in phases:
+		if length <= 0:
+			continue
+		row = np.full(steps, np.nan)
+		row[:len(flow.transitions)] = flow.transitions
+		A1_parts.append(np.full(length, flow.A1, dtype=np.int64))
+		T_parts.append(np.tile(row, (length, 1)))
+	if not A1_parts:
+		return np.zeros(0, dtype=np.int64), np.zeros((0, steps))
+	return np.concatenate(A1_parts), np.vstack(T_parts)
+
+
+def phase_max_retries(phases: List[Tuple[FlowScenario, int]]) -> np.ndarray:
+	"""Per-window `max_retries`, laid out like `stack_flow_phases`."""
+	parts = [np.full(length, flow.max_retries, dtype=np.int64) for flow, length in phases if length > 0]
+	return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+SAMPLING_MODES = ("normal", "exact", "auto")
+AUTO_SAMPLING_THRESHOLD = 10.0  # Min A_i·p and A_i·(1-p) for the normal approximation
+
+
+def simulate_step_counts(
+	A1: np.ndarray,
+	transitions: np.ndarray,
+	jitter: float | np.ndarray,
+	rng: np.random.Generator,
+	sampling: str = "normal",
+	max_retries: np.ndarray | None = None,
+	retry_spill: float | np.ndarray = 0.0,
+) -> np.ndarray:
+	"""Simulate per-step arrivals for a whole batch of windows at once.
+
+	`A1` holds the requests entering step 1 in each of W windows and
+	`transitions` is a (W × S) matrix of nominal T_i (NaN = pass-through).
+	`jitter` is a scalar or one value per window.
+	Jitter and binomial noise are drawn for the full matrix column by
+	column, so only the S steps are walked in Python; each step is one
+	array operation over all windows. Returns a (W × S+1) int64 matrix of
+	arrivals [A1, A2, ..., AS].
+
+	`sampling` picks how Binomial(A_i, p) is drawn:
+	- "normal": rounded, clamped normal approximation (the original model).
+	- "exact": vectorized binomial draws, correct at any volume.
+	- "auto": exact only for cells where A_i·p or A_i·(1-p) falls below
+	  `AUTO_SAMPLING_THRESHOLD`, normal everywhere else.
+
+	If any window has `max_retries` > 0, `simulate_retry_counts` then adds
+	retry requests on top of the users drawn above (with the same
+	`sampling`), so A_i(t) counts requests, retries included, while the
+	users passing each step are unchanged.
+	"""
+	if sampling not in SAMPLING_MODES:
+		raise ValueError(f"sampling must be one of {SAMPLING_MODES}, got {sampling!r}")
+	A1 = np.maximum(np.asarray(A1, dtype=np.int64), 0)
+	transitions = np.asarray(transitions, dtype=float)
+	windows, steps = transitions.shape
+	jitter = np.asarray(jitter, dtype=float)
+	if jitter.ndim == 1:
+		jitter = jitter[:, None]  # One jitter per window
+	padded = np.isnan(transitions)
+	low = np.where(padded, 1.0, np.maximum(0.0, transitions - jitter))
+	high = np.where(padded, 1.0, np.minimum(1.0, transitions + jitter))
+	p = rng.uniform(low, high)
+	if sampling != "exact":
+		z = rng.standard_normal((windows, steps))
+
+	counts = np.empty((windows, steps + 1), dtype=np.int64)
+	counts[:, 0] = A1
+	for i in range(steps):
+		A_current = counts[:, i]
+		p_i = p[:, i]
+		if sampling == "exact":
+			counts[:, i + 1] = rng.binomial(A_current, p_i)
+			continue
+		mean = A_current * p_i
+		std = np.sqrt(mean * (1.0 - p_i))
+		A_next = np.clip(np.rint(mean + std * z[:, i]).astype(np.int64), 0, A_current)
+		if sampling == "auto":
+			small = np.minimum(mean, A_current - mean) < AUTO_SAMPLING_THRESHOLD
+			if small.any():
+				A_next[small] = rng.binomial(A_current[small], p_i[small])
+		counts[:, i + 1] = A_next
+	if max_retries is not None and np.any(np.asarray(max_retries) > 0):
+		return simulate_retry_counts(counts, p, max_retries, rng, retry_spill, sampling)
+	return counts
+
+
+def _thin(n: np.ndarray, prob: np.ndarray, rng: np.random.Generator, sampling: str) -> np.ndarray:
+	"""One Binomial(n, prob) draw per cell, following `simulate_step_counts` sampling."""
+	if sampling == "exact":
+		return rng.binomial(n, prob)
+	mean = n * prob
+	drawn = np.clip(np.rint(mean + np.sqrt(mean * (1.0 - prob)) * rng.standard_normal(np.shape(n))).astype(np.int64), 0, n)
+	if sampling == "auto":
+		small = np.minimum(mean, n - mean) < AUTO_SAMPLING_THRESHOLD
+		if small.any():
+			drawn[small] = rng.binomial(n[small], prob[small])
+	return drawn
+
+
+def _retry_continuation(p: np.ndarray, max_retries: np.ndarray) -> np.ndarray:
+	"""Chance ρ that a user retries once more, matching `FlowScenario.arrivals`.
+
+	Retries per user are truncated geometric, P(N ≥ k) = ρ^k for
+	k ≤ max_retries, so E[N] = ρ + ρ² + ... + ρ^R. ρ solves
+	E[N] = min(1/p, 1 + R) - 1, the expected-attempts factor minus the
+	first attempt (ρ = 1 - p when R is large). Newton's method from ρ = 1
+	converges monotonically because the sum is convex in ρ.
+	"""
+	with np.errstate(divide="ignore"):
+		target = np.minimum(1.0 / p, 1.0 + max_retries) - 1.0
+	rho = np.where(max_retries > 0, 1.0, 0.0)
+	for _ in range(40):
+		value = np.zeros_like(rho)
+		slope = np.zeros_like(rho)
+		power = np.ones_like(rho)
+		for k in range(1, int(max_retries.max(initial=0)) + 1):
+			active = k <= max_retries
+			slope += np.where(active, k * power, 0.0)
+			power = power * rho
+			value += np.where(active, power, 0.0)
+		step = np.divide(value - target, slope, out=np.zeros_like(rho), where=slope > 0)
+		rho = np.clip(rho - step, 0.0, 1.0)
+		if not np.any(np.abs(step) > 1e-12):
+			break
+	return rho
+
+
+def simulate_retry_counts(
+	users: np.ndarray,
+	p: np.ndarray,
+	max_retries: int | np.ndarray,
+	rng: np.random.Generator,
+	retry_spill: float | np.ndarray = 0.0,
+	sampling: str = "exact",
+) -> np.ndarray:
+	"""Add stochastic retry requests to a (W × S+1) matrix of users per step.
+
+	`p` is the (W × S) matrix of per-window pass rates T_i that produced
+	`users`. As in `FlowScenario.arrivals`, T_i is the net share of users
+	passing step i and retries only add requests: each user at step i
+	retries a truncated-geometric number of times (at most `max_retries`,
+	scalar or per window) with mean min(1/T_i, 1 + max_retries) - 1, so
+	E[requests] matches the expected-attempts factor. Each retry round is
+	one draw over all windows (`sampling` as in `simulate_step_counts`), so
+	the cost is max_retries array operations per step, independent of
+	volume.
+
+	Backoff: the r-th retry of a window lands in the next window with
+	probability min(1, r · `retry_spill`). `retry_spill` can be per window;
+	set it to 0 on the last window of each independent series. Returns
+	requests per step, retries included; the last column (users reaching
+	the final step) is unchanged.
+	"""
+	users = np.asarray(users, dtype=np.int64)
+	p = np.asarray(p, dtype=float)
+	windows, steps = p.shape
+	max_retries = np.broadcast_to(np.asarray(max_retries, dtype=np.int64), (windows,))
+	spill = np.broadcast_to(np.asarray(retry_spill, dtype=float), (windows,))
+	counts = users.copy()
+	for i in range(steps):
+		rho = _retry_continuation(p[:, i], max_retries)
+		retrying = users[:, i]
+		for r in range(1, int(max_retries.max(initial=0)) + 1):
+			retrying = np.where(r <= max_retries, _thin(retrying, rho, rng, sampling), 0)
+			spilled = np.zeros(windows, dtype=np.int64)
+			if spill.any():
+				spilled = _thin(retrying, np.minimum(1.0, r * spill), rng, sampling)
+			counts[:, i] += retrying - spilled
+			counts[1:, i] += spilled[:-1]
+	return counts
+
+
+def conversion_from_counts(counts: np.ndarray) -> np.ndarray:
+	"""Return C(t) = A_S(t) / A_1(t) for a (windows × steps) count matrix.
+
+	Windows with no step-1 traffic yield NaN, matching `simulate_C_series`.
+	"""
+	A_first = counts[:, 0].astype(float)
+	A_last = counts[:, -1].astype(float)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		return np.where(A_first > 0, A_last / A_first, np.nan)
+
+
+@dataclass
+class WindowedCounts:
+	"""Per-window step arrivals with the derived ratios, stored as columns.
+
+	`arrivals` is a (windows × steps) matrix of A_i(t). T_i(t) and C(t)
+	are derived on access; ratios with a zero denominator are NaN.
+	`window_start` optionally holds each window's start time.
+	"""
+	arrivals: np.ndarray
+	window_start: np.ndarray | None = None
+
+	@property
+	def volume(self) -> np.ndarray:
+		"""A1(t), the requests entering step 1 per window."""
+		return self.arrivals[:, 0]
+
+	@property
+	def transitions(self) -> np.ndarray:
+		"""T_i(t) = A_{i+1}(t) / A_i(t) as a (windows × steps-1) matrix."""
+		A = self.arrivals.astype(float)
+		with np.errstate(divide="ignore", invalid="ignore"):
+			return np.where(A[:, :-1] > 0, A[:, 1:] / A[:, :-1], np.nan)
+
+	@property
+	def conversion(self) -> np.ndarray:
+		"""C(t) = A_S(t) / A_1(t)."""
+		return conversion_from_counts(self.arrivals)
+
+	def __len__(self) -> int:
+		return len(self.arrivals)
+
+
+@dataclass
+class JourneyGraph:
+	"""Branching journey: steps are nodes, edges carry transition probabilities.
+
+	`edges` lists `(from_step, to_step, probability)`. For a step with
+	several outgoing edges the probabilities are the shares of its users
+	taking each branch (they must sum to at most 1; the rest drop out), so
+	optional MFA or SSO-vs-password become separate paths. A self-loop
+	`(step, step, q)` models polling or retries: each request at the step
+	is repeated with probability q, so requests there are users / (1 - q).
+	Any other cycle is rejected.
+
+	`A1` users enter at `entry` (default: the first edge's source) and
+	`success` is the terminal step used for C(t) (default: the last step in
+	topological order). Arrivals are requests, as in `FlowScenario`, and
+	`FlowScenario` maps onto a chain via `from_flow`.
+	"""
+	name: str
+	A1: int
+	edges: List[Tuple[str, str, float]]
+	entry: str | None = None
+	success: str | None = None
+	nodes: List[str] = field(init=False)
+	order: List[int] = field(init=False, repr=False)
+	_levels: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = field(init=False, repr=False)
+	_loops: np.ndarray = field(init=False, repr=False)
+
+	def __post_init__(self) -> None:
+		names: Dict[str, int] = {}
+		for src, dst, _ in self.edges:
+			names.setdefault(src, len(names))
+			names.setdefault(dst, len(names))
+		if not names:
+			raise ValueError("A journey graph needs at least one edge")
+		self.nodes = list(names)
+		if self.entry is None:
+			self.entry = self.edges[0][0]
+		for node in (self.entry, self.success):
+			if node is not None and node not in names:
+				raise ValueError(f"Unknown step {node!r}")
+
+		n = len(self.nodes)
+		src = np.array([names[e[0]] for e in self.edges], dtype=np.int64)
+		dst = np.array([names[e[1]] for e in self.edges], dtype=np.int64)
+		prob = np.array([e[2] for e in self.edges], dtype=float)
+		if np.any((prob < 0) | (prob > 1)):
+			raise ValueError("Edge probabilities must lie in [0, 1]")
+		is_loop = src == dst
+		if np.any(np.bincount(src[is_loop], minlength=n) > 1):
+			raise ValueError("At most one self-loop per step")
+		if np.any(np.bincount(src[~is_loop], weights=prob[~is_loop], minlength=n) > 1 + 1e-9):
+			raise ValueError("Outgoing branch probabilities of a step must sum to at most 1")
+		self._loops = np.full(n, -1, dtype=np.int64)
+		self._loops[src[is_loop]] = np.flatnonzero(is_loop)
+
+		# Kahn's algorithm; a node's level is its longest distance from a source
+		edge_ids = np.flatnonzero(~is_loop)
+		indegree = np.bincount(dst[edge_ids], minlength=n)
+		level = np.zeros(n, dtype=np.int64)
+		ready = [v for v in range(n) if indegree[v] == 0]
+		self.order = []
+		while ready:
+			v = ready.pop(0)
+			self.order.append(v)
+			for e in edge_ids[src[edge_ids] == v]:
+				w = dst[e]
+				level[w] = max(level[w], level[v] + 1)
+				indegree[w] -= 1
+				if indegree[w] == 0:
+					ready.append(w)
+		if len(self.order) < n:
+			raise ValueError("Journey graph has a cycle (only self-loops are allowed)")
+		if self.success is None:
+			self.success = self.nodes[self.order[-1]]
+
+		# Per level: edge ids, their sources, target nodes and an edge → target incidence matrix
+		self._levels = []
+		for lvl in range(1, int(level.max()) + 1):
+			targets = np.flatnonzero(level == lvl)
+			ids = edge_ids[level[dst[edge_ids]] == lvl]
+			incidence = (dst[ids][:, None] == targets[None, :]).astype(float)
+			self._levels.append((ids, src[ids], targets, incidence))
+
+	@classmethod
+	def from_flow(cls, flow: FlowScenario) -> "JourneyGraph":
+		"""Linear chain equivalent to `flow`; retries become self-loops."""
+		steps = [f"step{i + 1}" for i in range(len(flow.transitions) + 1)]
+		edges = []
+		for i, T in enumerate(flow.transitions):
+			edges.append((steps[i], steps[i + 1], T))
+			if flow.max_retries > 0:
+				attempts_factor = min(1.0 / T, 1.0 + flow.max_retries) if T > 0 else 1.0 + flow.max_retries
+				edges.append((steps[i], steps[i], 1.0 - 1.0 / attempts_factor))
+		return cls(flow.name, flow.A1, edges, entry=steps[0], success=steps[-1])
+
+	@property
+	def probabilities(self) -> np.ndarray:
+		"""Nominal edge probabilities, in `edges` order."""
+		return np.array([e[2] for e in self.edges], dtype=float)
+
+	def index(self, node: str) -> int:
+		return self.nodes.index(node)
+
+	def propagate(self, A1: float | np.ndarray | None = None, probabilities: np.ndarray | None = None) -> np.ndarray:
+		"""Expected requests per step for every window in one pass.
+
+		`A1` is scalar or per window and `probabilities` is (edges,) or
+		(windows × edges); both default to the nominal graph. Users flow
+		level by level in topological order, each level being one gather
+		over its edges and one product with the level's incidence matrix,
+		so cost grows with edges, not paths. Returns (windows × nodes)
+		requests, columns in `nodes` order.
+		"""
+		P = np.atleast_2d(self.probabilities if probabilities is None else np.asarray(probabilities, dtype=float))
+		A1 = np.atleast_1d(np.asarray(self.A1 if A1 is None else A1, dtype=float))
+		windows = max(len(A1), len(P))
+		# Node-major layout keeps every gather a contiguous row copy
+		P = np.ascontiguousarray(np.broadcast_to(P, (windows, P.shape[1])).T)
+		users = np.zeros((len(self.nodes), windows))
+		users[self.index(self.entry)] = A1
+		for ids, sources, targets, incidence in self._levels:
+			users[targets] += incidence.T @ (users[sources] * P[ids])
+		loops = np.flatnonzero(self._loops >= 0)
+		with np.errstate(divide="ignore"):
+			users[loops] /= 1.0 - P[self._loops[loops]]
+		return users.T
+
+	@property
+	def arrivals(self) -> List[float]:
+		"""Deterministic requests per step, in `nodes` order."""
+		return self.propagate()[0].tolist()
+
+	def simulate(
+		self,
+		windows: int,
+		jitter: float = 0.0,
+		rng: np.random.Generator | np.random.SeedSequence | int | None = None,
+	) -> np.ndarray:
+		"""Draw per-step request counts for `windows` windows.
+
+		Every edge probability is jittered within ±`jitter` per window
+		(branch shares are rescaled if they then exceed 1). Each step's users
+		split over its branches with conditional binomial draws, and
+		self-loops add negative-binomial repeat requests. Steps are visited
+		once in topological order, each as a whole-array operation over all
+		windows. Returns (windows × nodes) int64 counts.
+		"""
+		rng = as_rng(rng)
+		n = len(self.nodes)
+		src = np.array([self.index(e[0]) for e in self.edges], dtype=np.int64)
+		dst = np.array([self.index(e[1]) for e in self.edges], dtype=np.int64)
+		P = np.clip(rng.uniform(self.probabilities - jitter, self.probabilities + jitter, (windows, len(self.edges))), 0.0, 1.0)
+		branch = src != dst
+		totals = np.zeros((windows, n))
+		np.add.at(totals.T, src[branch], P[:, branch].T)
+		P[:, branch] /= np.maximum(1.0, totals[:, src[branch]])
+
+		users = np.zeros((windows, n), dtype=np.int64)
+		users[:, self.index(self.entry)] = self.A1
+		requests = np.zeros_like(users)
+		for v in self.order:
+			remaining = users[:, v].copy()
+			left = np.ones(windows)
+			for e in np.flatnonzero(branch & (src == v)):
+				share = np.divide(P[:, e], left, out=np.zeros(windows), where=left > 0)
+				moved = rng.binomial(remaining, np.clip(share, 0.0, 1.0))
+				users[:, dst[e]] += moved
+				remaining -= moved
+				left -= P[:, e]
+			requests[:, v] = users[:, v]
+			loop = self._loops[v]
+			if loop >= 0:
+				has_users = users[:, v] > 0
+				requests[has_users, v] += rng.negative_binomial(users[has_users, v], 1.0 - np.minimum(P[has_users, loop], 1 - 1e-12))
+		return requests
+
+	def conversion(self, arrivals: np.ndarray, node: str | None = None) -> np.ndarray:
+		"""C(t) = A_success(t) / A_entry(t) from (windows × nodes) arrivals."""
+		A = np.asarray(arrivals, dtype=float)
+		first = A[..., self.index(self.entry)]
+		last = A[..., self.index(node or self.success)]
+		with np.errstate(divide="ignore", invalid="ignore"):
+			return np.where(first > 0, last / first, np.nan)
+
+	def paths(self, node: str | None = None) -> List[Tuple[str, ...]]:
+		"""Every path (self-loops skipped) from `entry` to `node` (default `success`)."""
+		target = self.index(node or self.success)
+		children: Dict[int, List[int]] = {}
+		for src, dst, _ in self.edges:
+			if src != dst:
+				children.setdefault(self.index(src), []).append(self.index(dst))
+		found: List[Tuple[str, ...]] = []
+		stack = [(self.index(self.entry),)]
+		while stack:
+			path = stack.pop()
+			if path[-1] == target:
+				found.append(tuple(self.nodes[v] for v in path))
+				continue
+			stack.extend(path + (w,) for w in reversed(children.get(path[-1], [])))
+		return found
+
+	def path_conversions(self, probabilities: np.ndarray | None = None, node: str | None = None) -> Dict[Tuple[str, ...], np.ndarray]:
+		"""Per-window share of entering users completing each path to `node`.
+
+		The shares sum to the user-level conversion; `conversion` on
+		requests can be higher where the success step has a self-loop.
+		"""
+		P = np.atleast_2d(self.probabilities if probabilities is None else np.asarray(probabilities, dtype=float))
+		edge_index = {(e[0], e[1]): i for i, e in enumerate(self.edges)}
+		return {
+			path: np.prod(P[:, [edge_index[hop] for hop in zip(path, path[1:])]], axis=1)
+			for path in self.paths(node)
+		}
+
+
 @dataclass
 class SimulationScenario:
 	"""Simulate C(t) over time for a base and test FlowScenario.
@@ -213,43 +711,44 @@ class SimulationScenario:
 	test: FlowScenario
 	test_length: int
 	jitter: float = 0.05
+	sampling: str = "normal"  # "normal", "exact" or "auto", see simulate_step_counts
+	retry_spill: float = 0.0  # Chance per retry round that a retry lands in the next window
+
+	def window_inputs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""Per-window A1, (windows × steps) nominal transitions and max_retries."""
+		phases = [(self.base, self.base_length), (self.test, self.test_length)]
+		return (*stack_flow_phases(phases), phase_max_retries(phases))
 
-	def simulate_C_series(self) -> List[float]:
-		"""Return a C(t) series: base phase then optional test phase.
+	def simulate(self, rng: np.random.Generator | np.random.SeedSequence | int | None = None) -> WindowedCounts:
+		"""Simulate every window once and return all per-step counts.
 
 		For each window we:
 		- Start with A1 = flow.A1 (requests entering step 1).
-		- For each step, jitter T_i within ±`jitter`, then approximate
-		  binomial(A_i, T_i) with a normal distribution so that volume
-		  controls how noisy the next-step arrivals are.
-		- Compute C(t) = A_S / A_1 from the simulated counts.
+		- For each step, jitter T_i within ±`jitter`, then draw
+		  binomial(A_i, T_i) (normal approximation by default, see
+		  `sampling`) so that volume controls how noisy the next-step
+		  arrivals are.
+		- If a flow has `max_retries` > 0, retry requests are drawn on top
+		  (see `simulate_retry_counts`), matching `FlowScenario.arrivals`
+		  on average.
+		The result holds A1(t), every A_i(t), T_i(t) and C(t) = A_S / A_1
+		from the same draw. All windows are simulated in a few array
+		operations; pass a Generator, seed or `SeedSequence` (see
+		`spawn_seeds`) to make runs reproducible.
 		"""
-		series: List[float] = []
-		total_windows = self.base_length + self.test_length
-		for idx in range(total_windows):
-			flow = self.base if idx < self.base_length else self.test
-			A_current = flow.A1
-			A_initial = A_current
-			if A_initial <= 0:
-				series.append(float("nan"))
-				continue
-			for T in flow.transitions:
-				low = max(0.0, T - self.jitter)
-				high = min(1.0, T + self.jitter)
-				p = random.uniform(low, high)
-				mean = A_current * p
-				var = A_current * p * (1.0 - p)
-				std = math.sqrt(var)
-				noise = random.gauss(0.0, std) if std > 0 else 0.0
-				A_next = int(round(mean + noise))
-				if A_next < 0:
-					A_next = 0
-				if A_next > A_current:
-					A_next = A_current
-				A_current = A_next
-			C_t = A_current / A_initial if A_initial > 0 else float("nan")
-			series.append(C_t)
-		return series
+		rng = as_rng(rng)
+		A1, transitions, max_retries = self.window_inputs()
+		spill = np.full(len(A1), self.retry_spill)
+		spill[-1:] = 0.0
+		return WindowedCounts(simulate_step_counts(A1, transitions, self.jitter, rng, self.sampling, max_retries, spill))
+
+	def simulate_C_series(self, rng: np.random.Generator | np.random.SeedSequence | int | None = None) -> List[float]:
+		"""Return a C(t) series: base phase then optional test phase."""
+		return self.simulate(rng).conversion.tolist()
+
+	def simulate_C_array(self, rng: np.random.Generator | np.random.SeedSequence | int | None = None) -> np.ndarray:
+		"""Return the C(t) series of `simulate` as an ndarray."""
+		return self.simulate(rng).conversion
 
 
 @dataclass
@@ -267,58 +766,83 @@ class SeasonalSimulation:
 	min_volume: int  # Minimum A1 (night)
 	max_volume: int  # Maximum A1 (peak hours)
 	jitter: float = 0.05
+	sampling: str = "normal"  # "normal", "exact" or "auto", see simulate_step_counts
+	retry_spill: float = 0.0  # Chance per retry round that a retry lands in the next window
 	
-	def simulate_C_series(self) -> List[float]:
-		"""Return C(t) series with seasonal volume variation.
-		
+	def volume_series(self) -> np.ndarray:
+		"""Per-window A1(t) following the sin² daily pattern.
+
 		Volume follows: A1(t) = min + (max-min) * sin²(π*t/period)
 		This creates a realistic daily pattern: low → peak → low
-		Can optionally inject a flow change (test) partway through.
 		"""
-		series: List[float] = []
 		total_windows = self.base_length + self.test_length
-		period = total_windows  # One full cycle over all windows
-		
-		for idx in range(total_windows):
-			# Sinusoidal volume pattern (0 at start/end, peak at middle)
-			phase = math.pi * idx / period
-			volume_factor = math.sin(phase) ** 2
-			A1 = int(self.min_volume + (self.max_volume - self.min_volume) * volume_factor)
-			
-			# Choose flow (base or test)
-			flow = self.base if idx < self.base_length else (self.test or self.base)
-			
-			# Simulate flow with this volume
-			A_current = A1
-			A_initial = A_current
-			if A_initial <= 0:
-				series.append(float("nan"))
-				continue
-				
-			for T in flow.transitions:
-				low = max(0.0, T - self.jitter)
-				high = min(1.0, T + self.jitter)
-				p = random.uniform(low, high)
-				mean = A_current * p
-				var = A_current * p * (1.0 - p)
-				std = math.sqrt(var)
-				noise = random.gauss(0.0, std) if std > 0 else 0.0
-				A_next = int(round(mean + noise))
-				if A_next < 0:
-					A_next = 0
-				if A_next > A_current:
-					A_next = A_current
-				A_current = A_next
-				
-			C_t = A_current / A_initial if A_initial > 0 else float("nan")
-			series.append(C_t)
-		return series
-
-
-def compute_individuals_control_limits(series: List[float], stable_windows: int) -> Tuple[float, float, float] | None:
+		period = max(total_windows, 1)  # One full cycle over all windows
+		volume_factor = np.sin(np.pi * np.arange(total_windows) / period) ** 2
+		return (self.min_volume + (self.max_volume - self.min_volume) * volume_factor).astype(np.int64)
+
+	def window_inputs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""Per-window seasonal A1, (windows × steps) nominal transitions and max_retries."""
+		phases = [(self.base, self.base_length), (self.test or self.base, self.test_length)]
+		_, transitions = stack_flow_phases(phases)
+		return self.volume_series(), transitions, phase_max_retries(phases)
+
+	def simulate(self, rng: np.random.Generator | np.random.SeedSequence | int | None = None) -> WindowedCounts:
+		"""Simulate every window once with seasonal volume; see `SimulationScenario.simulate`.
+
+		Can optionally inject a flow change (test) partway through. Volume
+		and C(t) in the result come from the same draw.
+		"""
+		rng = as_rng(rng)
+		A1, transitions, max_retries = self.window_inputs()
+		spill = np.full(len(A1), self.retry_spill)
+		spill[-1:] = 0.0
+		return WindowedCounts(simulate_step_counts(A1, transitions, self.jitter, rng, self.sampling, max_retries, spill))
+
+	def simulate_C_series(self, rng: np.random.Generator | np.random.SeedSequence | int | None = None) -> List[float]:
+		"""Return C(t) series with seasonal volume variation."""
+		return self.simulate(rng).conversion.tolist()
+
+	def simulate_C_array(self, rng: np.random.Generator | np.random.SeedSequence | int | None = None) -> np.ndarray:
+		"""Return the C(t) series of `simulate` as an ndarray."""
+		return self.simulate(rng).conversion
+
+
+def _simulate_scenario(
+	sim: "SimulationScenario | SeasonalSimulation",
+	seed: np.random.SeedSequence,
+) -> WindowedCounts:
+	"""Worker for `simulate_scenarios` (module-level so it pickles)."""
+	return sim.simulate(seed)
+
+
+def simulate_scenarios(
+	sims: List["SimulationScenario | SeasonalSimulation"],
+	seed: np.random.SeedSequence | int | None = None,
+	workers: int | None = None,
+) -> List[WindowedCounts]:
+	"""Simulate many scenarios (or replicates of one) in parallel.
+
+	Scenario i always draws from the i-th child of `spawn_seeds(seed, ...)`,
+	so results are identical for any number of `workers` and any
+	scheduling order (use `workers=1` to run inline).
+	"""
+	seeds = spawn_seeds(seed, len(sims))
+	if workers == 1:
+		return [_simulate_scenario(sim, child) for sim, child in zip(sims, seeds)]
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		return list(pool.map(_simulate_scenario, sims, seeds))
+
+
+def compute_individuals_control_limits(
+	series: List[float],
+	stable_windows: int,
+	k: float = 2.66,
+) -> Tuple[float, float, float] | None:
 	"""Compute mean and individuals-chart control limits from the stable prefix.
 
 	The first `stable_windows` points are treated as representing stable behavior.
+	`k` multiplies the mean moving range; 2.66 is the textbook SPC constant
+	for an individuals chart (see `calibrate_control_limits` to tune it).
 	Returns (mean, UCL, LCL), clamped to [0, 1], or None if not enough data.
 	"""
 	stable_C = np.array(series[:stable_windows])
@@ -328,19 +852,1049 @@ def compute_individuals_control_limits(series: List[float], stable_windows: int)
 	mean_C = np.mean(stable_C)
 	moving_ranges = np.abs(np.diff(stable_C))
 	mr_bar = np.mean(moving_ranges)
-	k = 2.66  # SPC constant for individuals chart
 	ucl = np.clip(mean_C + k * mr_bar, 0.0, 1.0)
 	lcl = np.clip(mean_C - k * mr_bar, 0.0, 1.0)
 	return mean_C, ucl, lcl
 
+def _windowed_sums(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+	"""Trailing sums and counts over `window` points along the last axis.
+
+	NaNs are tracked separately so that they only poison the windows that
+	contain them instead of every later cumulative sum.
+	"""
+	nan = np.isnan(values)
+	csum = np.cumsum(np.where(nan, 0.0, values), axis=-1)
+	cnan = np.cumsum(nan, axis=-1)
+	sums = csum.copy()
+	nans = cnan.copy()
+	sums[..., window:] -= csum[..., :-window]
+	nans[..., window:] -= cnan[..., :-window]
+	counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+	return np.where(nans > 0, np.nan, sums), counts
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+	"""Trailing moving average along the last axis in O(n) via cumulative sums.
+
+	The first `window - 1` points average over what is available, like
+	`compute_moving_average`. Works on a single series or a stack of them.
+	"""
+	values = np.asarray(values, dtype=float)
+	if values.shape[-1] == 0:
+		return values.copy()
+	sums, counts = _windowed_sums(values, window)
+	return sums / counts
+
+
+def rolling_control_limits(
+	series: np.ndarray,
+	lookback: int = 10,
+	k: float = 2.66,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""Rolling mean, UCL and LCL over the last `lookback` points, in O(n).
+
+	At each index the limits come from the trailing `lookback` values:
+	mean ± k · MR̄/1.128, clamped to [0, 1], where MR̄ is the mean moving
+	range inside that window. With fewer than 3 points available the band
+	collapses onto the value itself. Works along the last axis, so a stack
+	of series is handled in one call. Returns (mean, ucl, lcl) arrays.
+	"""
+	series = np.asarray(series, dtype=float)
+	n = series.shape[-1]
+	if n == 0:
+		return series.copy(), series.copy(), series.copy()
+	mean = rolling_mean(series, lookback)
+	# ranges[j] = |x_j - x_{j-1}|; the window ending at i holds the last
+	# lookback - 1 of them (the leading 0 pads the warm-up windows).
+	ranges = np.concatenate((np.zeros(series.shape[:-1] + (1,)), np.abs(np.diff(series, axis=-1))), axis=-1)
+	range_sums = _windowed_sums(ranges, lookback - 1)[0] if lookback > 1 else np.zeros_like(series)
+	window_len = np.minimum(np.arange(1, n + 1), lookback)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		sigma = range_sums / np.maximum(window_len - 1, 1) / 1.128
+	ucl = np.clip(mean + k * sigma, 0.0, 1.0)
+	lcl = np.clip(mean - k * sigma, 0.0, 1.0)
+	warmup = window_len < 3
+	mean = np.where(warmup, series, mean)
+	ucl = np.where(warmup, series, ucl)
+	lcl = np.where(warmup, series, lcl)
+	return mean, ucl, lcl
+
+
+def compute_p_chart_limits(
+	successes: np.ndarray,
+	trials: np.ndarray,
+	stable_windows: int,
+	k: float = 3.0,
+	laney: bool = True,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""Volume-aware p-chart limits with additive over-dispersion, one band per window.
+
+	For C(t) pass successes = A_S(t) and trials = A_1(t); for T_i(t) pass
+	A_{i+1}(t) and A_i(t) (a (windows × steps) stack works too). The centre
+	line p̄ = Σ successes / Σ trials comes from the first `stable_windows`
+	windows, and each window's band is p̄ ± k·sqrt(p̄(1-p̄)/n_t + σ²_extra)
+	in closed form from its own volume n_t, so bands are right from the
+	first window at both night and peak traffic. With `laney`, σ²_extra is
+	the over-dispersion (real jitter on top of binomial noise) of the
+	prefix: half the mean squared successive difference of p_t minus the
+	binomial part, floored at 0. It is added to the binomial variance
+	rather than scaling it as Laney's σ_z does, because the jitter does not
+	shrink with volume: a single multiplier made the band too wide at night
+	and too narrow at peak. Without it σ²_extra = 0 (plain p-chart).
+	Windows without trials get NaN limits. Returns (p̄, UCL, LCL), clamped
+	to [0, 1].
+	"""
+	successes = np.asarray(successes, dtype=float)
+	trials = np.asarray(trials, dtype=float)
+	with np.errstate(divide="ignore", invalid="ignore"):
+		p_bar = successes[:stable_windows].sum(axis=0) / trials[:stable_windows].sum(axis=0)
+		binomial = np.where(trials > 0, p_bar * (1.0 - p_bar) / trials, np.nan)
+		extra = 0.0
+		if laney:
+			p = successes[:stable_windows] / trials[:stable_windows]
+			with warnings.catch_warnings():
+				warnings.simplefilter("ignore", RuntimeWarning)
+				# E[(p_t - p_{t-1})²] = 2σ²_extra + b_t + b_{t-1}
+				mssd = np.nanmean(np.diff(p, axis=0) ** 2 - binomial[1:stable_windows] - binomial[:stable_windows - 1], axis=0)
+			extra = np.maximum(mssd / 2, 0.0)
+		sigma_p = np.sqrt(binomial + extra)
+	ucl = np.clip(p_bar + k * sigma_p, 0.0, 1.0)
+	lcl = np.clip(p_bar - k * sigma_p, 0.0, 1.0)
+	return p_bar, ucl, lcl
+
+
 def compute_moving_average(series: List[float], window: int) -> List[float]:
 	"""Compute simple moving average over a window."""
-	arr = np.array(series)
-	ma = []
-	for i in range(len(arr)):
-		start = max(0, i - window + 1)
-		ma.append(np.mean(arr[start:i+1]))
-	return ma
+	return rolling_mean(np.asarray(series, dtype=float), window).tolist()
+
+
+def conversion_moments(
+	A1: float | np.ndarray,
+	transitions: List[float] | np.ndarray,
+	jitter: float | np.ndarray = 0.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+	"""Exact mean and variance of C(t) under the simulators' noise model.
+
+	Each window draws p_i ~ Uniform[T_i - jitter, T_i + jitter] (clipped
+	to [0, 1], NaN = pass-through) and A_{i+1} ~ Binomial(A_i, p_i). With
+	m_i = E[p_i] and s_i = E[p_i²], the first two moments follow the
+	recursion
+		E[A_{i+1}] = m_i · E[A_i]
+		E[A_{i+1}²] = (m_i - s_i) · E[A_i] + s_i · E[A_i²],
+	so C = A_S / A_1 needs no simulation. Arguments broadcast: `A1` and
+	`jitter` of shape (...) with `transitions` of shape (..., S) evaluate
+	a whole grid of scenarios at once, walking only the S steps in Python.
+	"""
+	A1 = np.asarray(A1, dtype=float)
+	T = np.asarray(transitions, dtype=float)
+	jitter = np.asarray(jitter, dtype=float)[..., None]
+	padded = np.isnan(T)
+	low = np.where(padded, 1.0, np.maximum(0.0, T - jitter))
+	high = np.where(padded, 1.0, np.minimum(1.0, T + jitter))
+	m = (low + high) / 2
+	s = (low * low + low * high + high * high) / 3
+	mean_A = A1
+	second_A = A1 * A1
+	for i in range(T.shape[-1]):
+		second_A = (m[..., i] - s[..., i]) * mean_A + s[..., i] * second_A
+		mean_A = m[..., i] * mean_A
+	with np.errstate(divide="ignore", invalid="ignore"):
+		mean_C = np.where(A1 > 0, mean_A / A1, np.nan)
+		var_C = np.where(A1 > 0, np.maximum(second_A / (A1 * A1) - mean_C * mean_C, 0.0), np.nan)
+	return mean_C, var_C
+
+
+def analytic_control_limits(
+	flow: FlowScenario,
+	jitter: float | np.ndarray = 0.0,
+	A1: float | np.ndarray | None = None,
+	k: float = 2.66,
+	ma_window: int = 1,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""Expected (mean, UCL, LCL) of the C(t) chart without simulating.
+
+	Uses `conversion_moments` for `flow` at volume `A1` (default
+	`flow.A1`) and `jitter`; both may be arrays for capacity-planning
+	grids. The limits are what `compute_individuals_control_limits` (with
+	the same `k`) converges to on the `ma_window`-point moving average of a
+	long stable series: for independent normal windows the mean moving
+	range of that average is 2σ / (ma_window · √π). Retries are not
+	covered by the closed form; simulate flows with `max_retries` > 0.
+	"""
+	if flow.max_retries > 0:
+		raise ValueError("Analytic limits assume no retries; use the simulator for flows with max_retries > 0")
+	mean_C, var_C = conversion_moments(flow.A1 if A1 is None else A1, flow.transitions, jitter)
+	mr_bar = 2.0 * np.sqrt(var_C) / (ma_window * math.sqrt(math.pi))
+	return mean_C, np.clip(mean_C + k * mr_bar, 0.0, 1.0), np.clip(mean_C - k * mr_bar, 0.0, 1.0)
+
+
+@dataclass
+class AnalyticValidation:
+	"""Closed-form C(t) statistics next to the same statistics from simulation."""
+	windows: int
+	analytic_mean: float
+	analytic_std: float
+	analytic_limits: Tuple[float, float]
+	simulated_mean: float
+	simulated_std: float
+	simulated_limits: Tuple[float, float]
+
+	@property
+	def mean_error(self) -> float:
+		"""Relative error of the analytic mean."""
+		return abs(self.analytic_mean - self.simulated_mean) / self.simulated_mean
+
+	@property
+	def std_error(self) -> float:
+		"""Relative error of the analytic standard deviation."""
+		return abs(self.analytic_std - self.simulated_std) / self.simulated_std
+
+
+def validate_analytic_limits(
+	flow: FlowScenario,
+	jitter: float = 0.0,
+	A1: int | None = None,
+	k: float = 2.66,
+	ma_window: int = 1,
+	windows: int = 100_000,
+	sampling: str = "exact",
+	rng: np.random.Generator | np.random.SeedSequence | int | None = None,
+) -> AnalyticValidation:
+	"""Check `analytic_control_limits` against `windows` simulated windows.
+
+	The simulated limits come from `compute_individuals_control_limits`
+	on the moving average of the simulated C(t), i.e. the chart the plots
+	draw. With the default exact sampling the errors shrink towards zero
+	as `windows` grows; "normal" sampling shows the bias of the normal
+	approximation at low volume.
+	"""
+	A1 = flow.A1 if A1 is None else A1
+	sim_flow = FlowScenario(flow.name, A1, flow.transitions, flow.max_retries)
+	sim = SimulationScenario(flow.name, sim_flow, windows, sim_flow, 0, jitter=jitter, sampling=sampling)
+	C = sim.simulate_C_array(rng)
+	C = C[~np.isnan(C)]
+	mean_C, var_C = conversion_moments(A1, flow.transitions, jitter)
+	_, ucl, lcl = analytic_control_limits(flow, jitter, A1, k, ma_window)
+	_, sim_ucl, sim_lcl = compute_individuals_control_limits(compute_moving_average(C.tolist(), ma_window), len(C), k)
+	return AnalyticValidation(
+		windows=windows,
+		analytic_mean=float(mean_C),
+		analytic_std=float(np.sqrt(var_C)),
+		analytic_limits=(float(ucl), float(lcl)),
+		simulated_mean=float(np.mean(C)),
+		simulated_std=float(np.std(C, ddof=1)),
+		simulated_limits=(float(sim_ucl), float(sim_lcl)),
+	)
+
+
+@dataclass
+class _RollingSum:
+	"""Running sum over the last `size` pushed values (NaN-aware)."""
+	size: int
+	values: deque = field(default_factory=deque)
+	total: float = 0.0
+	nans: int = 0
+
+	def push(self, value: float) -> None:
+		if self.size <= 0:
+			return
+		if len(self.values) == self.size:
+			old = self.values.popleft()
+			if math.isnan(old):
+				self.nans -= 1
+			else:
+				self.total -= old
+		self.values.append(value)
+		if math.isnan(value):
+			self.nans += 1
+		else:
+			self.total += value
+
+	def mean(self) -> float:
+		if not self.values or self.nans:
+			return float("nan")
+		return self.total / len(self.values)
+
+
+@dataclass
+class RollingControlChart:
+	"""Streaming moving average and rolling control limits, O(1) per window.
+
+	Feed one C(t) (or T_i(t)) value per closed window to `update`. It keeps
+	running sums for the `ma_window` moving average, the last `lookback`
+	MA values and their moving ranges, and returns the same numbers as
+	`rolling_mean` + `rolling_control_limits` would for the whole series.
+	"""
+	ma_window: int
+	lookback: int = 10
+	k: float = 2.66
+	_raw: _RollingSum = field(init=False)
+	_ma: _RollingSum = field(init=False)
+	_ranges: _RollingSum = field(init=False)
+	_last_ma: float | None = field(init=False, default=None)
+
+	def __post_init__(self) -> None:
+		self._raw = _RollingSum(self.ma_window)
+		self._ma = _RollingSum(self.lookback)
+		self._ranges = _RollingSum(self.lookback - 1)
+
+	def update(self, value: float) -> Tuple[float, float, float, float]:
+		"""Add one window and return (ma, mean, ucl, lcl) for it."""
+		self._raw.push(value)
+		ma = self._raw.mean()
+		if self._last_ma is not None:
+			self._ranges.push(abs(ma - self._last_ma))
+		self._last_ma = ma
+		self._ma.push(ma)
+		if len(self._ma.values) < 3:
+			return ma, ma, ma, ma
+		mean = self._ma.mean()
+		sigma = self._ranges.mean() / 1.128
+		if math.isnan(mean) or math.isnan(sigma):
+			return ma, mean, float("nan"), float("nan")
+		ucl = min(max(mean + self.k * sigma, 0.0), 1.0)
+		lcl = min(max(mean - self.k * sigma, 0.0), 1.0)
+		return ma, mean, ucl, lcl
+
+
+@dataclass
+class ExponentialBaseline:
+	"""Slowly moving baseline for C(t) or T_i(t), O(1) per window.
+
+	Holds exponentially weighted accumulators for the mean and the mean
+	moving range, elementwise over any shape (e.g. one entry per step of a
+	flow, or flows × steps), so limits are mean ± k · MR̄ as in
+	`compute_individuals_control_limits` but the baseline forgets old
+	windows with weight (1 - alpha) per window (see `alpha_for_half_life`).
+	Until 1/alpha windows have been seen the weight is 1/n, i.e. a plain
+	running average. NaN values (no traffic) leave their entry unchanged.
+
+	`freeze` stops learning for some or all entries while an incident is
+	open; the last value is still tracked so the first moving range after
+	`thaw` spans consecutive windows. `snapshot`/`restore` (and
+	`save_baselines`/`load_baselines` for many flows) persist the state.
+	"""
+	shape: Tuple[int, ...] = ()
+	alpha: float = 0.01
+	k: float = 2.66
+	mean: np.ndarray = field(default=None)
+	mr_bar: np.ndarray = field(default=None)
+	last: np.ndarray = field(default=None)
+	count: np.ndarray = field(default=None)
+	frozen: np.ndarray = field(default=None)
+
+	def __post_init__(self) -> None:
+		if not 0 < self.alpha <= 1:
+			raise ValueError("alpha must be in (0, 1]")
+		self.shape = tuple(self.shape)
+		for name, fill, dtype in (("mean", np.nan, float), ("mr_bar", np.nan, float), ("last", np.nan, float), ("count", 0, np.int64), ("frozen", False, bool)):
+			value = getattr(self, name)
+			setattr(self, name, np.full(self.shape, fill, dtype=dtype) if value is None else np.array(value, dtype=dtype).reshape(self.shape))
+
+	@staticmethod
+	def alpha_for_half_life(windows: float) -> float:
+		"""alpha for which a window's weight halves after `windows` windows."""
+		return 1.0 - 0.5 ** (1.0 / windows)
+
+	@classmethod
+	def from_history(cls, series: np.ndarray, alpha: float = 0.01, k: float = 2.66) -> "ExponentialBaseline":
+		"""Start from a stable stretch (time on axis 0), like `stable_windows`.
+
+		NaN entries are skipped; an entry with fewer than two values starts
+		without limits.
+		"""
+		series = np.asarray(series, dtype=float)
+		baseline = cls(series.shape[1:], alpha, k)
+		if len(series) == 0:
+			return baseline
+		valid = ~np.isnan(series)
+		# Forward-fill so each moving range spans consecutive non-NaN values
+		index = np.where(valid, np.arange(len(series)).reshape((-1,) + (1,) * (series.ndim - 1)), 0)
+		np.maximum.accumulate(index, axis=0, out=index)
+		carried = np.take_along_axis(series, index, axis=0)
+		with warnings.catch_warnings():
+			warnings.simplefilter("ignore", RuntimeWarning)
+			baseline.mean = np.nanmean(series, axis=0)
+			baseline.mr_bar = np.nanmean(np.abs(series[1:] - carried[:-1]), axis=0)
+		baseline.count = valid.sum(axis=0)
+		baseline.last = carried[-1]
+		return baseline
+
+	def limits(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""Current (mean, UCL, LCL), clamped to [0, 1]; NaN until two values were seen."""
+		spread = np.where(self.count >= 2, self.k * self.mr_bar, np.nan)
+		return self.mean, np.clip(self.mean + spread, 0.0, 1.0), np.clip(self.mean - spread, 0.0, 1.0)
+
+	def update(self, values: np.ndarray | float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""Judge one window against the current limits, then learn from it.
+
+		Returns the (mean, UCL, LCL) the window should be compared with,
+		i.e. the limits from before this update.
+		"""
+		before = tuple(np.copy(a) for a in self.limits())
+		values = np.broadcast_to(np.asarray(values, dtype=float), self.shape)
+		seen = ~np.isnan(values)
+		learn = seen & ~self.frozen
+		count = self.count + learn
+		weight = np.maximum(self.alpha, 1.0 / np.maximum(count, 1))
+		self.mean = np.where(learn, np.where(count == 1, values, self.mean + weight * (values - self.mean)), self.mean)
+		has_range = learn & ~np.isnan(self.last)
+		ranges = np.abs(values - self.last)
+		mr_weight = np.maximum(self.alpha, 1.0 / np.maximum(count - 1, 1))
+		self.mr_bar = np.where(has_range, np.where(np.isnan(self.mr_bar), ranges, self.mr_bar + mr_weight * (ranges - self.mr_bar)), self.mr_bar)
+		self.last = np.where(seen, values, self.last)
+		self.count = count
+		return before
+
+	def freeze(self, mask: np.ndarray | bool = True) -> None:
+		"""Stop learning for the entries in `mask` (all by default)."""
+		self.frozen = self.frozen | np.broadcast_to(mask, self.shape)
+
+	def thaw(self, mask: np.ndarray | bool = True) -> None:
+		"""Resume learning for the entries in `mask` (all by default)."""
+		self.frozen = self.frozen & ~np.broadcast_to(mask, self.shape)
+
+	def snapshot(self) -> Dict[str, np.ndarray]:
+		"""State as plain arrays; `restore` rebuilds the baseline from it."""
+		return {
+			"alpha": np.array(self.alpha),
+			"k": np.array(self.k),
+			"mean": self.mean,
+			"mr_bar": self.mr_bar,
+			"last": self.last,
+			"count": self.count,
+			"frozen": self.frozen,
+		}
+
+	@classmethod
+	def restore(cls, state: Dict[str, np.ndarray]) -> "ExponentialBaseline":
+		mean = np.asarray(state["mean"])
+		return cls(
+			mean.shape, float(state["alpha"]), float(state["k"]),
+			mean, state["mr_bar"], state["last"], state["count"], state["frozen"],
+		)
+
+
+def save_baselines(path: str, baselines: Dict[str, ExponentialBaseline]) -> None:
+	"""Write baselines keyed by flow to one .npz file, atomically."""
+	arrays = {"names": np.array(list(baselines), dtype=str)}
+	for i, baseline in enumerate(baselines.values()):
+		arrays.update({f"{i}.{key}": value for key, value in baseline.snapshot().items()})
+	tmp = f"{path}.tmp"
+	with open(tmp, "wb") as f:
+		np.savez(f, **arrays)
+	os.replace(tmp, path)
+
+
+def load_baselines(path: str) -> Dict[str, ExponentialBaseline]:
+	"""Read baselines written by `save_baselines`."""
+	with np.load(path) as data:
+		return {
+			str(name): ExponentialBaseline.restore({key.split(".", 1)[1]: data[key] for key in data.files if key.startswith(f"{i}.")})
+			for i, name in enumerate(data["names"])
+		}
+
+
+HOUR_OF_WEEK_ORIGIN = 4 * 86_400.0  # Monday 1970-01-05 00:00 UTC, so slot 0 is Monday 00:00
+
+
+def conversion_and_transitions(counts: WindowedCounts) -> np.ndarray:
+	"""(windows × 1+transitions) matrix with C(t) first, then every T_i(t)."""
+	return np.column_stack([counts.conversion, counts.transitions])
+
+
+@dataclass
+class SeasonalBaseline:
+	"""Per-slot baselines for C(t) and T_i(t), e.g. one per hour of the week.
+
+	A window at time t belongs to slot ((t - origin) // slot_seconds) %
+	slots; the defaults give 168 hour-of-week slots starting Monday 00:00
+	UTC (use `slot_seconds=300, slots=2016` for five-minute slots). Each
+	slot keeps a count, sum and sum of squares per series in (slots ×
+	series) arrays, so `build` is one `np.add.at` pass over history, `add`
+	updates only the touched slots and `limits` is an index lookup into a
+	cached (slots × series) table of mean ± k·σ. The per-slot σ absorbs
+	both the daily and weekly pattern of C(t) and the volume-dependent
+	noise, which a single baseline cannot. Slots with fewer than
+	`min_count` windows have NaN limits.
+	"""
+	num_series: int
+	slots: int = 168
+	slot_seconds: float = 3600.0
+	origin: float = HOUR_OF_WEEK_ORIGIN
+	k: float = 3.0
+	min_count: int = 2
+	count: np.ndarray = field(init=False, repr=False)
+	total: np.ndarray = field(init=False, repr=False)
+	total_sq: np.ndarray = field(init=False, repr=False)
+	_table: np.ndarray = field(init=False, repr=False)
+
+	def __post_init__(self) -> None:
+		if self.slots <= 0 or self.slot_seconds <= 0:
+			raise ValueError("slots and slot_seconds must be positive")
+		self.count = np.zeros((self.slots, self.num_series), dtype=np.int64)
+		self.total = np.zeros((self.slots, self.num_series))
+		self.total_sq = np.zeros((self.slots, self.num_series))
+		self._table = np.full((3, self.slots, self.num_series), np.nan)
+
+	def slot(self, timestamps: np.ndarray | float) -> np.ndarray:
+		"""Slot index of each window start time."""
+		return (np.floor((np.asarray(timestamps, dtype=float) - self.origin) / self.slot_seconds) % self.slots).astype(np.int64)
+
+	@classmethod
+	def build(cls, timestamps: np.ndarray, values: np.ndarray, **params) -> "SeasonalBaseline":
+		"""Baseline from historical (windows × series) `values` in one pass."""
+		values = np.asarray(values, dtype=float)
+		baseline = cls(values.shape[1] if values.ndim > 1 else 1, **params)
+		baseline.add(timestamps, values)
+		return baseline
+
+	@classmethod
+	def from_counts(cls, counts: WindowedCounts, **params) -> "SeasonalBaseline":
+		"""`build` on C(t) and T_i(t) of `counts`, keyed by `window_start`."""
+		if counts.window_start is None:
+			raise ValueError("counts need window_start times to be placed in slots")
+		return cls.build(counts.window_start, conversion_and_transitions(counts), **params)
+
+	def add(self, timestamps: np.ndarray | float, values: np.ndarray) -> None:
+		"""Fold more windows (one or many) into their slots; NaN values are skipped."""
+		slots = np.atleast_1d(self.slot(timestamps))
+		values = np.asarray(values, dtype=float).reshape(len(slots), self.num_series)
+		seen = ~np.isnan(values)
+		clean = np.where(seen, values, 0.0)
+		np.add.at(self.count, slots, seen)
+		np.add.at(self.total, slots, clean)
+		np.add.at(self.total_sq, slots, clean * clean)
+		touched = np.unique(slots)
+		n = self.count[touched].astype(float)
+		with np.errstate(divide="ignore", invalid="ignore"):
+			mean = self.total[touched] / n
+			var = np.maximum(self.total_sq[touched] - n * mean * mean, 0.0) / (n - 1)
+		spread = np.where(n >= self.min_count, self.k * np.sqrt(var), np.nan)
+		self._table[:, touched] = [
+			np.where(n > 0, mean, np.nan),
+			np.clip(mean + spread, 0.0, 1.0),
+			np.clip(mean - spread, 0.0, 1.0),
+		]
+
+	def limits(self, timestamps: np.ndarray | float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""(mean, UCL, LCL) for windows starting at `timestamps`, each (..., series)."""
+		mean, ucl, lcl = self._table[:, self.slot(timestamps)]
+		return mean, ucl, lcl
+
+	def out_of_control(self, timestamps: np.ndarray | float, values: np.ndarray) -> np.ndarray:
+		"""True where a value falls outside its slot's limits."""
+		_, ucl, lcl = self.limits(timestamps)
+		values = np.asarray(values, dtype=float).reshape(ucl.shape)
+		return (values > ucl) | (values < lcl)
+
+
+DETECTOR_METHODS = ("cusum", "ewma")
+
+
+def _ewma_block_size(lam: float) -> int:
+	"""Largest block for which the closed-form EWMA weights stay in float range."""
+	return max(1, int(150 * math.log(10) / -math.log(1.0 - lam))) if lam < 1 else 1
+
+
+@dataclass
+class ChangeDetector:
+	"""CUSUM or EWMA change detector for C(t) or a stack of T_i(t) series.
+
+	Time runs along axis 0, so a (windows × steps) T_i(t) matrix tracks
+	every step at once. Both methods are calibrated like
+	`compute_individuals_control_limits`: the target mean and
+	σ = MR̄/1.128 come from a stable prefix (`calibrate`).
+
+	- "cusum": tabular two-sided CUSUM on standardized values with
+	  reference `kappa` and decision interval `h` (in σ units).
+	- "ewma": z_t = λ·x_t + (1-λ)·z_{t-1}, flagged outside
+	  mean ± L·σ·sqrt(λ/(2-λ)·(1-(1-λ)^{2t})).
+
+	`update` advances the state by one window in O(1); `run` processes a
+	whole block with cumulative operations and leaves the detector in the
+	same state as the equivalent `update` calls. Windows without data
+	(NaN) hold the CUSUM sums and count as on-target for the EWMA.
+	Alarms do not reset the state.
+	"""
+	method: str
+	mean: np.ndarray
+	sigma: np.ndarray
+	kappa: float = 0.5
+	h: float = 4.0
+	lam: float = 0.2
+	L: float = 3.0
+	_upper: np.ndarray = field(init=False)
+	_lower: np.ndarray = field(init=False)
+	_z: np.ndarray = field(init=False)
+	_t: int = field(init=False, default=0)
+
+	def __post_init__(self) -> None:
+		if self.method not in DETECTOR_METHODS:
+			raise ValueError(f"method must be one of {DETECTOR_METHODS}, got {self.method!r}")
+		self.mean = np.asarray(self.mean, dtype=float)
+		self.sigma = np.maximum(np.asarray(self.sigma, dtype=float), np.finfo(float).eps)
+		self._upper = np.zeros_like(self.mean)
+		self._lower = np.zeros_like(self.mean)
+		self._z = self.mean.copy()
+
+	@classmethod
+	def calibrate(cls, series: np.ndarray, stable_windows: int, method: str = "cusum", **params) -> "ChangeDetector":
+		"""Estimate mean and σ from the first `stable_windows` windows."""
+		stable = np.asarray(series, dtype=float)[:stable_windows]
+		if len(stable) < 2:
+			raise ValueError("need at least 2 stable windows to calibrate")
+		with warnings.catch_warnings():
+			warnings.simplefilter("ignore", RuntimeWarning)
+			mean = np.nanmean(stable, axis=0)
+			sigma = np.nanmean(np.abs(np.diff(stable, axis=0)), axis=0) / 1.128
+		return cls(method, mean, sigma, **params)
+
+	def _ewma_width(self, t: np.ndarray) -> np.ndarray:
+		factor = self.lam / (2.0 - self.lam) * (1.0 - (1.0 - self.lam) ** (2 * t))
+		return self.L * self.sigma * np.sqrt(factor)
+
+	def update(self, value: float | np.ndarray) -> bool | np.ndarray:
+		"""Add one window; return the alarm flag(s) for it."""
+		x = np.asarray(value, dtype=float)
+		self._t += 1
+		if self.method == "cusum":
+			d = np.where(np.isnan(x), 0.0, (x - self.mean) / self.sigma)
+			hold = np.isnan(x)
+			self._upper = np.where(hold, self._upper, np.maximum(0.0, self._upper + d - self.kappa))
+			self._lower = np.where(hold, self._lower, np.maximum(0.0, self._lower - d - self.kappa))
+			flags = (self._upper > self.h) | (self._lower > self.h)
+		else:
+			x = np.where(np.isnan(x), self.mean, x)
+			self._z = self.lam * x + (1.0 - self.lam) * self._z
+			flags = np.abs(self._z - self.mean) > self._ewma_width(np.asarray(self._t))
+		return flags if flags.ndim else bool(flags)
+
+	def run(self, series: np.ndarray) -> np.ndarray:
+		"""Process a block of windows (time on axis 0) and return alarm flags."""
+		x = np.asarray(series, dtype=float)
+		n = len(x)
+		if n == 0:
+			return np.zeros(x.shape, dtype=bool)
+		t = self._t + np.arange(1, n + 1).reshape((n,) + (1,) * (x.ndim - 1))
+		self._t += n
+		if self.method == "cusum":
+			d = np.where(np.isnan(x), 0.0, (x - self.mean) / self.sigma)
+			step = np.where(np.isnan(x), 0.0, 1.0)
+			# Lindley recursion S_t = max(0, S_{t-1} + d_t) in closed form:
+			# S_t = D_t - min(-S_0, min_{j<=t} D_j) with D the running sum.
+			sums = []
+			for sign, start in ((1.0, self._upper), (-1.0, self._lower)):
+				D = np.cumsum(sign * d - self.kappa * step, axis=0)
+				sums.append(D - np.minimum(-start, np.minimum.accumulate(D, axis=0)))
+			upper, lower = sums
+			self._upper, self._lower = upper[-1], lower[-1]
+			return (upper > self.h) | (lower > self.h)
+
+		x = np.where(np.isnan(x), self.mean, x)
+		z = np.empty_like(x)
+		decay = 1.0 - self.lam
+		block = _ewma_block_size(self.lam)
+		z_prev = self._z
+		for start in range(0, n, block):
+			chunk = x[start:start + block]
+			j = np.arange(1, len(chunk) + 1).reshape((len(chunk),) + (1,) * (x.ndim - 1))
+			# z_j = decay^j·z_0 + λ·Σ_{i<=j} decay^(j-i)·x_i
+			weighted = np.cumsum(chunk * decay ** (-j), axis=0)
+			z[start:start + block] = decay ** j * (z_prev + self.lam * weighted)
+			z_prev = z[start + len(chunk) - 1]
+		self._z = z_prev
+		return np.abs(z - self.mean) > self._ewma_width(t)
+
+
+def detect_changes(series: np.ndarray, stable_windows: int, method: str = "cusum", **params) -> np.ndarray:
+	"""Batch CUSUM/EWMA alarms for a whole series, calibrated on its stable prefix."""
+	return ChangeDetector.calibrate(series, stable_windows, method, **params).run(series)
+
+
+@dataclass
+class CalibrationResult:
+	"""Monte Carlo operating characteristics of one control-chart setting.
+
+	`window_size` is in template windows (a size of 5 sums 5 consecutive
+	template windows into one), and `mean_time_to_detect` is measured in
+	template windows from the injected change to the close of the first
+	flagged window, so settings with different window sizes compare directly.
+	"""
+	k: float
+	ma_window: int
+	window_size: int
+	replicates: int
+	false_positive_rate: float
+	detection_rate: float
+	mean_time_to_detect: float
+
+
+def _simulate_replicates(
+	sim: SimulationScenario,
+	phases: List[Tuple[FlowScenario, int]],
+	replicates: int,
+	window_size: int,
+	rng: np.random.Generator,
+) -> np.ndarray:
+	"""Simulate (replicates × windows) C(t) with `window_size` windows merged."""
+	phases = [(flow, length * window_size) for flow, length in phases]
+	A1, transitions = stack_flow_phases(phases)
+	windows = len(A1) // window_size
+	spill = np.full(len(A1), sim.retry_spill)
+	spill[-1:] = 0.0  # Replicates are independent series
+	counts = simulate_step_counts(
+		np.tile(A1, replicates), np.tile(transitions, (replicates, 1)), sim.jitter, rng, sim.sampling,
+		np.tile(phase_max_retries(phases), replicates), np.tile(spill, replicates),
+	)
+	counts = counts.reshape(replicates * windows, window_size, -1).sum(axis=1)
+	return conversion_from_counts(counts).reshape(replicates, windows)
+
+
+def _injects_change(sim: SimulationScenario) -> bool:
+	"""True if the test phase runs a different flow than the base phase."""
+	return (sim.test.A1, list(sim.test.transitions)) != (sim.base.A1, list(sim.base.transitions))
+
+
+def _calibration_chunk(
+	sim: SimulationScenario,
+	k_values: List[float],
+	ma_windows: List[int],
+	window_sizes: List[int],
+	replicates: int,
+	seed: np.random.SeedSequence,
+) -> dict:
+	"""Run one block of replicates and return summed counts per setting.
+
+	For each window size we simulate one in-control run (base flow only)
+	and, if the test flow differs, one run with the change injected after
+	`base_length` windows. Every (k, ma_window) pair is evaluated on the
+	same draws, with limits calibrated per replicate from the base prefix.
+	"""
+	rng = np.random.default_rng(seed)
+	has_change = _injects_change(sim)
+	stable = sim.base_length
+	totals = {}
+	for window_size in window_sizes:
+		in_control = _simulate_replicates(
+			sim, [(sim.base, sim.base_length + sim.test_length)], replicates, window_size, rng
+		)
+		changed = None
+		if has_change:
+			changed = _simulate_replicates(
+				sim, [(sim.base, sim.base_length), (sim.test, sim.test_length)], replicates, window_size, rng
+			)
+		for ma_window in ma_windows:
+			ma_runs = [rolling_mean(run, ma_window) for run in (in_control, changed) if run is not None]
+			for k in k_values:
+				flags = []
+				for ma in ma_runs:
+					prefix = ma[:, :stable]
+					mean = prefix.mean(axis=1, keepdims=True)
+					mr_bar = np.abs(np.diff(prefix, axis=1)).mean(axis=1, keepdims=True)
+					ucl = np.clip(mean + k * mr_bar, 0.0, 1.0)
+					lcl = np.clip(mean - k * mr_bar, 0.0, 1.0)
+					monitored = ma[:, stable:]
+					flags.append((monitored > ucl) | (monitored < lcl))
+				false_alarms = int(flags[0].sum())
+				detected = 0
+				ttd_sum = 0.0
+				if has_change:
+					hit = flags[1].any(axis=1)
+					first = np.argmax(flags[1], axis=1)
+					detected = int(hit.sum())
+					ttd_sum = float(((first[hit] + 1) * window_size).sum())
+				totals[(k, ma_window, window_size)] = (false_alarms, flags[0].size, detected, ttd_sum)
+	return totals
+
+
+def calibrate_control_limits(
+	template: FlowScenario | SimulationScenario,
+	k_values: List[float],
+	ma_windows: List[int],
+	window_sizes: List[int],
+	replicates: int = 10_000,
+	seed: int | None = None,
+	workers: int | None = None,
+	chunk_size: int = 1_000,
+	baseline_windows: int = 40,
+	monitor_windows: int = 40,
+	jitter: float = 0.0,
+) -> List[CalibrationResult]:
+	"""Estimate false-positive rate and time-to-detect for control-chart settings.
+
+	Runs `replicates` independent simulations of `template` for every
+	(k, ma_window, window size) combination. Limits follow
+	`compute_individuals_control_limits` on the moving average: calibrated
+	from the first `base_length` windows of each replicate, then applied to
+	the remaining windows.
+
+	- A `SimulationScenario` template supplies the base/test phases; its
+	  test phase must be non-empty. If `test` differs from `base`, the
+	  change is injected to measure detection.
+	- A bare `FlowScenario` is monitored in-control only, using
+	  `baseline_windows` + `monitor_windows` and transition `jitter`
+	  (default 0.0: binomial noise only, as in the original template;
+	  pass the jitter the flow sees in production for realistic
+	  limits); detection fields are NaN.
+	  `jitter` is ignored for a `SimulationScenario`, which has its own.
+
+	Replicates are split into blocks of `chunk_size` and spread across a
+	`ProcessPoolExecutor`; each block draws from its own child of
+	`numpy.random.SeedSequence(seed)`, so a given seed gives the same
+	results for any number of `workers` (use `workers=1` to run inline).
+	"""
+	if isinstance(template, FlowScenario):
+		sim = SimulationScenario(
+			name=template.name,
+			base=template,
+			base_length=baseline_windows,
+			test=template,
+			test_length=monitor_windows,
+			jitter=jitter,
+		)
+	else:
+		sim = template
+	if sim.base_length < 2 or sim.test_length <= 0:
+		raise ValueError("Calibration needs at least 2 baseline windows and a non-empty monitoring phase")
+
+	chunks = [min(chunk_size, replicates - start) for start in range(0, replicates, chunk_size)]
+	seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+	args = [(sim, k_values, ma_windows, window_sizes, n, chunk_seed) for n, chunk_seed in zip(chunks, seeds)]
+	if workers == 1:
+		partials = [_calibration_chunk(*a) for a in args]
+	else:
+		with ProcessPoolExecutor(max_workers=workers) as pool:
+			partials = list(pool.map(_calibration_chunk, *zip(*args)))
+
+	results: List[CalibrationResult] = []
+	has_change = _injects_change(sim)
+	for key in partials[0] if partials else []:
+		false_alarms, monitored, detected, ttd_sum = (sum(part[key][i] for part in partials) for i in range(4))
+		k, ma_window, window_size = key
+		results.append(CalibrationResult(
+			k=k,
+			ma_window=ma_window,
+			window_size=window_size,
+			replicates=replicates,
+			false_positive_rate=false_alarms / monitored if monitored else float("nan"),
+			detection_rate=detected / replicates if has_change else float("nan"),
+			mean_time_to_detect=ttd_sum / detected if detected else float("nan"),
+		))
+	return results
+
+@dataclass
+class Attribution:
+	"""Per-transition suspicion scores for every window (and flow).
+
+	Arrays are shaped (..., windows, transitions), matching the arrivals
+	they came from minus one step. `scores` is the standardized drop of
+	T_i(t) below its baseline (higher = more suspect, NaN for masked
+	steps), `contributions` is each transition's share of the drop in
+	log C(t), and `ranking` lists transition indices, most suspect first.
+	"""
+	scores: np.ndarray
+	contributions: np.ndarray
+	ranking: np.ndarray
+
+	def suspects(self, alerts: np.ndarray, top: int = 3) -> List[Tuple[Tuple[int, ...], List[Tuple[int, float]]]]:
+		"""Ranked (transition, score) suspects for each alerting window.
+
+		`alerts` is a boolean mask shaped like the windows axis (e.g.
+		`FleetEvaluation.out_of_control` or C(t) < LCL). Keys are the
+		(flow, window) or (window,) index of each alert.
+		"""
+		results = []
+		for index in zip(*np.nonzero(alerts)):
+			order = self.ranking[index][:top]
+			scores = self.scores[index]
+			results.append((tuple(int(i) for i in index), [(int(i), float(scores[i])) for i in order if not np.isnan(scores[i])]))
+		return results
+
+
+def attribute_transitions(
+	arrivals: np.ndarray,
+	stable_windows: int,
+	num_steps: np.ndarray | None = None,
+	laney: bool = True,
+) -> Attribution:
+	"""Score which T_i(t) broke, for all windows (and flows) in one pass.
+
+	`arrivals` is (windows × steps) or (flows × windows × steps); the first
+	`stable_windows` windows are the baseline. Each transition gets:
+	- a per-step p-chart score: z_i(t) = (T̄_i - T_i(t)) / sqrt(T̄_i(1-T̄_i)/A_i(t)),
+	  divided by Laney's σ_z from the baseline when `laney` is set, so a
+	  drop at a low-volume step is not over-weighted;
+	- its share of the log-ratio decomposition
+	  log C(t) - log C̄ = Σ_i (log T_i(t) - log T̄_i).
+	`num_steps` masks padded steps of shorter flows, as in `FlowFleet`.
+	"""
+	A = np.asarray(arrivals, dtype=float)
+	with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+		warnings.simplefilter("ignore", RuntimeWarning)
+		T = np.where(A[..., :-1] > 0, A[..., 1:] / A[..., :-1], np.nan)
+		if num_steps is not None:
+			mask = np.arange(A.shape[-1] - 1) < (np.asarray(num_steps) - 1)[..., None]
+			T = np.where(mask[..., None, :], T, np.nan)
+		base = A[..., :stable_windows, :]
+		T_bar = base[..., 1:].sum(axis=-2, keepdims=True) / base[..., :-1].sum(axis=-2, keepdims=True)
+		sigma = np.sqrt(T_bar * (1.0 - T_bar) / A[..., :-1])
+		drop = T_bar - T
+		z = np.where(drop == 0, 0.0, drop / sigma)
+		if laney:
+			sigma_z = np.nanmean(np.abs(np.diff(z[..., :stable_windows, :], axis=-2)), axis=-2, keepdims=True) / 1.128
+			z = np.where(sigma_z > 0, z / sigma_z, z)
+		delta = np.log(T) - np.log(T_bar)
+		total = np.nansum(np.where(np.isfinite(delta), delta, 0.0), axis=-1, keepdims=True)
+		contributions = np.where(total < 0, delta / total, np.nan)
+	ranking = np.argsort(-np.where(np.isnan(z), -np.inf, z), axis=-1, kind="stable")
+	return Attribution(z, contributions, ranking)
+
+
+@dataclass
+class FleetEvaluation:
+	"""Vectorized per-window results for every flow in a `FlowFleet`.
+
+	Arrays are indexed (flows × windows) except `transitions`, which is
+	(flows × windows × steps-1) with NaN in the masked-out steps.
+	"""
+	names: List[str]
+	transitions: np.ndarray
+	conversion: np.ndarray
+	moving_average: np.ndarray
+	mean: np.ndarray
+	ucl: np.ndarray
+	lcl: np.ndarray
+	out_of_control: np.ndarray
+
+	def alerting(self, window: int = -1) -> List[str]:
+		"""Names of the flows flagged out of control in `window`."""
+		return [self.names[i] for i in np.nonzero(self.out_of_control[:, window])[0]]
+
+
+@dataclass
+class FlowFleet:
+	"""Many flows stored as one padded (flows × windows × steps) arrivals array.
+
+	Flows may have different numbers of steps and windows: `num_steps`
+	records each flow's length, padded steps are zero and masked out, and
+	padded windows have no traffic (so C(t) is NaN and never alerts).
+	"""
+	names: List[str]
+	arrivals: np.ndarray
+	num_steps: np.ndarray
+
+	@classmethod
+	def from_counts(cls, counts: Dict[str, WindowedCounts]) -> "FlowFleet":
+		"""Pack per-flow `WindowedCounts` into one padded fleet array."""
+		names = list(counts)
+		windows = max((len(c) for c in counts.values()), default=0)
+		steps = max((c.arrivals.shape[1] for c in counts.values()), default=0)
+		arrivals = np.zeros((len(names), windows, steps), dtype=np.int64)
+		for i, name in enumerate(names):
+			A = counts[name].arrivals
+			arrivals[i, :A.shape[0], :A.shape[1]] = A
+		num_steps = np.array([counts[name].arrivals.shape[1] for name in names], dtype=np.int64)
+		return cls(names, arrivals, num_steps)
+
+	@classmethod
+	def simulate(
+		cls,
+		sims: List["SimulationScenario | SeasonalSimulation"],
+		rng: np.random.Generator | np.random.SeedSequence | int | None = None,
+	) -> "FlowFleet":
+		"""Simulate every scenario with one batched engine call per sampling mode."""
+		rng = as_rng(rng)
+		inputs = [sim.window_inputs() for sim in sims]
+		windows = max((len(A1) for A1, _, _ in inputs), default=0)
+		steps = max((T.shape[1] for _, T, _ in inputs), default=0) + 1
+		arrivals = np.zeros((len(sims), windows, steps), dtype=np.int64)
+		for mode in dict.fromkeys(sim.sampling for sim in sims):
+			members = [i for i, sim in enumerate(sims) if sim.sampling == mode]
+			A1 = np.concatenate([inputs[i][0] for i in members])
+			T = np.vstack([np.pad(inputs[i][1], ((0, 0), (0, steps - 1 - inputs[i][1].shape[1])), constant_values=np.nan) for i in members])
+			jitter = np.concatenate([np.full(len(inputs[i][0]), sims[i].jitter) for i in members])
+			max_retries = np.concatenate([inputs[i][2] for i in members])
+			# Retries never spill from one flow's last window into the next flow
+			lengths = np.array([len(inputs[i][0]) for i in members], dtype=np.int64)
+			spill = np.repeat([sims[i].retry_spill for i in members], lengths).astype(float)
+			spill[np.cumsum(lengths)[lengths > 0] - 1] = 0.0
+			counts = simulate_step_counts(A1, T, jitter, rng, mode, max_retries, spill)
+			offset = 0
+			for i in members:
+				length, flow_steps = len(inputs[i][0]), inputs[i][1].shape[1] + 1
+				arrivals[i, :length, :flow_steps] = counts[offset:offset + length, :flow_steps]
+				offset += length
+		num_steps = np.array([T.shape[1] + 1 for _, T, _ in inputs], dtype=np.int64)
+		return cls([sim.name for sim in sims], arrivals, num_steps)
+
+	def evaluate(
+		self,
+		ma_window: int = 5,
+		lookback: int = 10,
+		k: float = 2.66,
+		stable_windows: int | None = 20,
+	) -> FleetEvaluation:
+		"""Compute T_i(t), C(t), limits and out-of-control flags for all flows.
+
+		The `ma_window` moving average of C(t) is judged against limits whose
+		spread comes from the moving range of the raw C(t), scaled by
+		1/√(points averaged): consecutive MA values overlap, so their own
+		moving range would understate the noise and flood the fleet with
+		alerts. By default the limits are fixed, mean ± k · MR̄ from each
+		flow's first `stable_windows` windows, as in
+		`compute_individuals_control_limits`. With `stable_windows=None` they
+		roll instead: mean ± k · MR̄/1.128 over the previous `lookback`
+		windows, as in `rolling_control_limits`, with each window judged
+		against the band up to the window before it and no limits (so no
+		alerts) until `lookback` windows have been seen.
+		"""
+		A = self.arrivals.astype(float)
+		flows, windows, steps = A.shape
+		step_mask = np.arange(steps - 1)[None, :] < (self.num_steps - 1)[:, None]
+		with np.errstate(divide="ignore", invalid="ignore"):
+			T = np.where(A[:, :, :-1] > 0, A[:, :, 1:] / A[:, :, :-1], np.nan)
+			T = np.where(step_mask[:, None, :], T, np.nan)
+			last = np.take_along_axis(A, np.broadcast_to((self.num_steps - 1)[:, None, None], (flows, windows, 1)), axis=2)[:, :, 0]
+			C = np.where(A[:, :, 0] > 0, last / A[:, :, 0], np.nan)
+
+		ma = rolling_mean(C, ma_window)
+		# The first ma_window - 1 averages cover fewer windows and are noisier
+		averaged = np.sqrt(np.minimum(np.arange(1, windows + 1), ma_window))
+		ranges = np.concatenate((np.full((flows, 1), np.nan), np.abs(np.diff(C, axis=1))), axis=1)
+		if stable_windows is None:
+			nan_column = np.full((flows, 1), np.nan)
+			mean = rolling_mean(C, lookback)
+			if lookback > 1:
+				mr_bar = np.concatenate((nan_column, rolling_mean(ranges[:, 1:], lookback - 1)), axis=1)
+			else:
+				mr_bar = np.full(C.shape, np.nan)
+			spread = k * mr_bar / 1.128
+			warmup = np.arange(windows) + 1 < lookback
+			mean = np.where(warmup, np.nan, mean)
+			ucl = np.where(warmup, np.nan, np.clip(mean + spread / averaged, 0.0, 1.0))
+			lcl = np.where(warmup, np.nan, np.clip(mean - spread / averaged, 0.0, 1.0))
+			# Judge window t against the band built from windows up to t - 1
+			mean_ref = np.concatenate((nan_column, mean[:, :-1]), axis=1)
+			spread_ref = np.concatenate((nan_column, spread[:, :-1]), axis=1)
+			ucl_ref = np.clip(mean_ref + spread_ref / averaged, 0.0, 1.0)
+			lcl_ref = np.clip(mean_ref - spread_ref / averaged, 0.0, 1.0)
+		else:
+			with np.errstate(invalid="ignore"), warnings.catch_warnings():
+				warnings.simplefilter("ignore", RuntimeWarning)
+				mean_C = np.nanmean(C[:, :stable_windows], axis=1, keepdims=True)
+				mr_bar = np.nanmean(ranges[:, 1:stable_windows], axis=1, keepdims=True)
+			mean = np.broadcast_to(mean_C, ma.shape)
+			ucl = ucl_ref = np.clip(mean_C + k * mr_bar / averaged, 0.0, 1.0)
+			lcl = lcl_ref = np.clip(mean_C - k * mr_bar / averaged, 0.0, 1.0)
+		with np.errstate(invalid="ignore"):
+			out_of_control = (ma > ucl_ref) | (ma < lcl_ref)
+		return FleetEvaluation(self.names, T, C, ma, mean, ucl, lcl, out_of_control)
+
+	def attribute(self, stable_windows: int, laney: bool = True) -> Attribution:
+		"""Rank suspect transitions for every flow and window, see `attribute_transitions`."""
+		return attribute_transitions(self.arrivals, stable_windows, self.num_steps, laney)
+
 
 def plot_C_with_limits(
 	sim: SimulationScenario,
@@ -450,47 +2004,10 @@ def plot_seasonal_volume_and_C(
 	Dual-axis plot: volume on left axis, C(t) on right axis.
 	Demonstrates that C(t) remains stable despite dramatic volume changes.
 	"""
-	# We need to re-simulate to capture volume at each step
-	total_windows = sim.base_length + sim.test_length
-	period = total_windows
-	
-	volume_series = []
-	C_series = []
-	
-	for idx in range(total_windows):
-		# Sinusoidal volume pattern
-		phase = math.pi * idx / period
-		volume_factor = math.sin(phase) ** 2
-		A1 = int(sim.min_volume + (sim.max_volume - sim.min_volume) * volume_factor)
-		volume_series.append(A1)
-		
-		# Choose flow
-		flow = sim.base if idx < sim.base_length else (sim.test or sim.base)
-		
-		# Simulate C(t)
-		A_current = A1
-		A_initial = A_current
-		if A_initial <= 0:
-			C_series.append(float("nan"))
-			continue
-			
-		for T in flow.transitions:
-			low = max(0.0, T - sim.jitter)
-			high = min(1.0, T + sim.jitter)
-			p = random.uniform(low, high)
-			mean = A_current * p
-			var = A_current * p * (1.0 - p)
-			std = math.sqrt(var)
-			noise = random.gauss(0.0, std) if std > 0 else 0.0
-			A_next = int(round(mean + noise))
-			if A_next < 0:
-				A_next = 0
-			if A_next > A_current:
-				A_next = A_current
-			A_current = A_next
-			
-		C_t = A_current / A_initial if A_initial > 0 else float("nan")
-		C_series.append(C_t)
+	# Volume and C(t) come from the same simulated windows
+	result = sim.simulate()
+	volume_series = result.volume
+	C_series = result.conversion
 	
 	windows = list(range(1, len(C_series) + 1))
 	
@@ -538,50 +2055,34 @@ def plot_seasonal_C_with_ma(
 	filename: str = "images/plot18.png",
 	title: str | None = None,
 	highlight_test_phase: bool = False,
+	volume_aware: bool = False,
 ) -> None:
 	"""Plot C(t) for seasonal volume pattern with moving average control limits.
 	
 	Shows how control limits naturally widen/narrow as traffic volume changes
 	throughout the day, demonstrating adaptive monitoring behavior.
+	With `volume_aware`, the band is the over-dispersed p-chart of raw C(t)
+	computed from each window's own A1(t) instead of the rolling MA limits.
 	"""
-	C_series = sim.simulate_C_series()
+	result = sim.simulate()
+	C_series = result.conversion
 	windows = list(range(1, len(C_series) + 1))
 	
 	# Compute moving average
 	ma_series = compute_moving_average(C_series, ma_window)
 	
-	# For seasonal data, compute rolling control limits (window-by-window)
-	# Use a sliding window to compute limits that adapt to volume changes
-	ucl_series = []
-	lcl_series = []
-	mean_series = []
-	
-	ma_array = np.array(ma_series)
-	
-	for i in range(len(ma_series)):
-		# Use past 10 windows (or available) to compute current limits
-		lookback = min(10, i + 1)
-		window_data = ma_array[max(0, i - lookback + 1):i + 1]
-		
-		if len(window_data) >= 3:
-			mean_val = np.mean(window_data)
-			mr = np.abs(np.diff(window_data))
-			if len(mr) > 0:
-				mr_bar = np.mean(mr)
-				sigma = mr_bar / 1.128
-				ucl_val = np.clip(mean_val + 2.66 * sigma, 0.0, 1.0)
-				lcl_val = np.clip(mean_val - 2.66 * sigma, 0.0, 1.0)
-			else:
-				ucl_val = mean_val
-				lcl_val = mean_val
-		else:
-			mean_val = ma_series[i] if i < len(ma_series) else np.nan
-			ucl_val = mean_val
-			lcl_val = mean_val
-			
-		mean_series.append(mean_val)
-		ucl_series.append(ucl_val)
-		lcl_series.append(lcl_val)
+	if volume_aware:
+		# Closed-form band per window from its own volume, no warm-up
+		p_bar, ucl_series, lcl_series = compute_p_chart_limits(
+			result.arrivals[:, -1], result.volume, stable_windows=sim.base_length
+		)
+		mean_series = np.full(len(windows), p_bar)
+		limits_label, mean_label = "Volume-aware limits (p-chart)", "Baseline mean"
+	else:
+		# For seasonal data, compute rolling control limits (window-by-window)
+		# from the past 10 MA values so they adapt to volume changes
+		mean_series, ucl_series, lcl_series = rolling_control_limits(ma_series, lookback=10)
+		limits_label, mean_label = "Adaptive control limits", "Rolling mean"
 	
 	plt.figure(figsize=(10, 5))
 	
@@ -599,10 +2100,10 @@ def plot_seasonal_C_with_ma(
 	
 	# Plot adaptive control limits
 	plt.plot(windows, ucl_series, color="#666666", linestyle="dotted", 
-			 label="Adaptive control limits", linewidth=1.5, alpha=0.7)
+			 label=limits_label, linewidth=1.5, alpha=0.7)
 	plt.plot(windows, lcl_series, color="#666666", linestyle="dotted", linewidth=1.5, alpha=0.7)
 	plt.plot(windows, mean_series, color="#1f77b4", linestyle="dashed", 
-			 label="Rolling mean", linewidth=2, alpha=0.5)
+			 label=mean_label, linewidth=2, alpha=0.5)
 	
 	plt.title(title or "C(t) with Seasonal Volume Pattern", fontsize=12, fontweight="bold")
 	plt.xlabel("Time window (5-min intervals)", fontsize=11)
@@ -615,7 +2116,781 @@ def plot_seasonal_C_with_ma(
 	plt.close()
 
 
-def simulate_windowed_T(num_users_per_minute: int, num_minutes: int, p_success: float = 0.9, mean_delay: float = 1.0):
+@dataclass
+class StepWindowAggregator:
+	"""Turn a stream of (timestamp, step) request events into A_i(t) windows.
+
+	Events are assigned to tumbling windows of `window_seconds` starting
+	at `origin`. Counters for the windows that are still open live in one
+	small (open windows × steps) int64 array, so memory is bounded by
+	`allowed_lateness` rather than by event rate.
+
+	Watermark policy: the watermark trails the largest timestamp seen by
+	`allowed_lateness`. A window closes (and is emitted) once the watermark
+	passes its end; events that arrive for an already-closed window are
+	dropped and counted in `late_events`.
+
+	Future guard: an event more than `max_future` seconds ahead of the
+	reference time is invalid, dropped and counted in `future_events`, so
+	one bad clock value can neither close every window nor blow up the
+	buffer (at most (allowed_lateness + max_future) / window_seconds + 2
+	windows are ever open). The reference is `clock()` if given, otherwise
+	the largest valid timestamp so far; without a clock, a silence longer
+	than `max_future` makes the events after it invalid, so set it above
+	the longest expected gap in a replay. Before any event has been
+	accepted there is no such timestamp, so without a clock the first
+	event is held until a second one arrives and the first reference is
+	the median of the events held so far; one bad first timestamp can
+	then not mark every real event after it late.
+	"""
+	num_steps: int
+	window_seconds: float
+	allowed_lateness: float = 0.0
+	origin: float = 0.0
+	max_future: float = 3600.0
+	clock: Callable[[], float] | None = None
+	late_events: int = 0
+	future_events: int = 0
+	_counts: np.ndarray = field(init=False, repr=False)
+	_first_open: int | None = field(init=False, default=None)
+	_max_ts: float = field(init=False, default=-math.inf)
+	_held: Tuple[np.ndarray, np.ndarray] | None = field(init=False, default=None, repr=False)
+
+	def __post_init__(self) -> None:
+		if self.window_seconds <= 0:
+			raise ValueError("window_seconds must be positive")
+		if not 0 <= self.allowed_lateness < math.inf:
+			raise ValueError("allowed_lateness must be a finite, non-negative number of seconds")
+		if not 0 <= self.max_future < math.inf:
+			raise ValueError("max_future must be a finite, non-negative number of seconds")
+		self._counts = np.zeros((0, self.num_steps), dtype=np.int64)
+
+	def _window_index(self, timestamps: np.ndarray) -> np.ndarray:
+		return np.floor((timestamps - self.origin) / self.window_seconds).astype(np.int64)
+
+	def _valid(self, timestamps: np.ndarray) -> np.ndarray:
+		"""Mask of events within `max_future` of the reference time."""
+		if self.clock is not None:
+			return timestamps <= self.clock() + self.max_future
+		reference = self._max_ts if self._max_ts > -math.inf else float(np.median(timestamps))
+		# Grow the accepted set from the events within reach of the
+		# reference: each pass lets accepted events extend the reach by
+		# max_future, so this takes about span / max_future + 1 passes
+		# whatever the number of bad timestamps, and stops at exactly the
+		# events per-event processing would accept.
+		valid = timestamps <= reference + self.max_future
+		while True:
+			seen = np.maximum.accumulate(np.where(valid, timestamps, -math.inf))
+			before = np.maximum(reference, np.concatenate([[-math.inf], seen[:-1]]))
+			grown = timestamps <= before + self.max_future
+			if np.array_equal(grown, valid):
+				return valid
+			valid = grown
+
+	def add(self, timestamps: np.ndarray, steps: np.ndarray) -> WindowedCounts:
+		"""Ingest a batch of events (in arrival order) and return closed windows.
+
+		`steps` are 0-based step indices. The batch is processed with array
+		operations only; the result is exactly what per-event processing in
+		the same order would produce.
+		"""
+		timestamps = np.asarray(timestamps, dtype=float)
+		steps = np.asarray(steps, dtype=np.int64)
+		if timestamps.shape != steps.shape:
+			raise ValueError("timestamps and steps must have the same shape")
+		if len(steps) and (steps.min() < 0 or steps.max() >= self.num_steps):
+			raise ValueError(f"step indices must be in [0, {self.num_steps})")
+		if self.clock is None and self._max_ts == -math.inf:
+			if self._held is not None:
+				timestamps = np.concatenate([self._held[0], timestamps])
+				steps = np.concatenate([self._held[1], steps])
+				self._held = None
+			if len(timestamps) == 1:
+				# Wait for a second event before trusting the first timestamp
+				self._held = (timestamps, steps)
+				return self._emit_closed()
+		if len(timestamps) == 0:
+			return self._emit_closed()
+		valid = self._valid(timestamps)
+		self.future_events += int(len(valid) - valid.sum())
+		timestamps = timestamps[valid]
+		steps = steps[valid]
+		if len(timestamps) == 0:
+			return self._emit_closed()
+
+		# Watermark as seen by each event when it arrives; an event is on
+		# time while the watermark has not passed the end of its window.
+		watermark = np.maximum.accumulate(np.maximum(timestamps, self._max_ts)) - self.allowed_lateness
+		idx = self._window_index(timestamps)
+		on_time = idx >= self._window_index(watermark)
+		self.late_events += int(len(idx) - on_time.sum())
+		self._max_ts = max(self._max_ts, float(timestamps.max()))
+
+		idx = idx[on_time]
+		if len(idx):
+			oldest = int(idx.min())
+			if self._first_open is None:
+				self._first_open = oldest
+			elif oldest < self._first_open:
+				# An older window is still open: grow the buffer at the front
+				front = np.zeros((self._first_open - oldest, self.num_steps), dtype=np.int64)
+				self._counts = np.vstack([front, self._counts])
+				self._first_open = oldest
+			span = max(len(self._counts), int(idx.max()) - self._first_open + 1)
+			flat = (idx - self._first_open) * self.num_steps + steps[on_time]
+			batch = np.bincount(flat, minlength=span * self.num_steps).reshape(span, self.num_steps)
+			batch[:len(self._counts)] += self._counts
+			self._counts = batch
+		return self._emit_closed()
+
+	def flush(self) -> WindowedCounts:
+		"""Close every open window, e.g. at the end of a replay."""
+		if self._held is not None:
+			timestamps, steps = self._held
+			self._held = None
+			self._max_ts = float(timestamps[0])
+			self.add(timestamps, steps)
+		if self._first_open is not None:
+			self._max_ts = max(self._max_ts, self.origin + (self._first_open + len(self._counts)) * self.window_seconds + self.allowed_lateness)
+		return self._emit_closed()
+
+	def _emit_closed(self) -> WindowedCounts:
+		if self._first_open is None or self._max_ts == -math.inf:
+			return WindowedCounts(np.zeros((0, self.num_steps), dtype=np.int64), np.zeros(0))
+		watermark = self._max_ts - self.allowed_lateness
+		closed = max(0, int(self._window_index(np.array(watermark))) - self._first_open)
+		if closed > len(self._counts):
+			# Windows skipped entirely by the stream close empty.
+			self._counts = np.vstack([self._counts, np.zeros((closed - len(self._counts), self.num_steps), dtype=np.int64)])
+		starts = self.origin + (self._first_open + np.arange(closed)) * self.window_seconds
+		result = WindowedCounts(self._counts[:closed], starts)
+		self._counts = self._counts[closed:].copy()
+		self._first_open += closed
+		return result
+
+
+COUNT_STORE_MAGIC = b"JMCOUNT1"
+COUNT_STORE_HEADER = struct.Struct("<8sIIddQ")  # magic, steps, itemsize, window_seconds, origin, windows
+COUNT_STORE_HEADER_SIZE = 64  # Header is padded so the data block stays 8-byte aligned
+
+
+@dataclass
+class CountStore:
+	"""Append-only on-disk history of A_i(t) for one flow.
+
+	File layout: a 64-byte little-endian header (magic, steps, item size,
+	window length in seconds, origin, number of windows) followed by a
+	fixed-width (windows × steps) int32 or int64 matrix. Windows are
+	contiguous, so the window index is implicit: row r starts at
+	`origin + r * window_seconds`. Readers `np.memmap` the file and a time
+	range is a plain row slice, so nothing is parsed or copied until the
+	values are actually used.
+	"""
+	path: str
+	num_steps: int
+	window_seconds: float
+	origin: float = 0.0
+	dtype: str = "int64"
+	num_windows: int = 0
+
+	@classmethod
+	def create(cls, path: str, num_steps: int, window_seconds: float, origin: float = 0.0, dtype: str = "int64") -> "CountStore":
+		"""Create an empty store file, replacing any existing one."""
+		if np.dtype(dtype) not in (np.dtype("int32"), np.dtype("int64")):
+			raise ValueError("dtype must be int32 or int64")
+		store = cls(path, num_steps, window_seconds, origin, np.dtype(dtype).name)
+		with open(path, "wb") as f:
+			f.write(store._header())
+		return store
+
+	@classmethod
+	def open(cls, path: str) -> "CountStore":
+		"""Open an existing store by reading its header."""
+		with open(path, "rb") as f:
+			magic, steps, itemsize, window_seconds, origin, windows = COUNT_STORE_HEADER.unpack(
+				f.read(COUNT_STORE_HEADER.size)
+			)
+		if magic != COUNT_STORE_MAGIC:
+			raise ValueError(f"{path} is not a count store")
+		return cls(path, steps, window_seconds, origin, "int32" if itemsize == 4 else "int64", windows)
+
+	def _header(self) -> bytes:
+		header = COUNT_STORE_HEADER.pack(
+			COUNT_STORE_MAGIC, self.num_steps, np.dtype(self.dtype).itemsize,
+			self.window_seconds, self.origin, self.num_windows,
+		)
+		return header.ljust(COUNT_STORE_HEADER_SIZE, b"\0")
+
+	def append(self, counts: WindowedCounts | np.ndarray) -> None:
+		"""Append windows to the end of the store.
+
+		`WindowedCounts` with `window_start` are placed at their own
+		windows: a gap since the last stored window is filled with zeros
+		and windows that are already stored raise `ValueError`. Data is
+		written before the header, so readers never see a partial window.
+		"""
+		arrivals = counts.arrivals if isinstance(counts, WindowedCounts) else np.asarray(counts)
+		if arrivals.ndim != 2 or arrivals.shape[1] != self.num_steps:
+			raise ValueError(f"expected a (windows × {self.num_steps}) array")
+		if isinstance(counts, WindowedCounts) and counts.window_start is not None and len(arrivals):
+			first = int(round((counts.window_start[0] - self.origin) / self.window_seconds))
+			if first < self.num_windows:
+				raise ValueError("windows overlap data that is already stored")
+			arrivals = np.vstack([np.zeros((first - self.num_windows, self.num_steps), dtype=arrivals.dtype), arrivals])
+		info = np.iinfo(self.dtype)
+		if len(arrivals) and (arrivals.min() < info.min or arrivals.max() > info.max):
+			raise ValueError(f"counts do not fit in {self.dtype}")
+		with open(self.path, "r+b") as f:
+			f.seek(COUNT_STORE_HEADER_SIZE + self.num_windows * self.num_steps * np.dtype(self.dtype).itemsize)
+			f.write(np.ascontiguousarray(arrivals, dtype=self.dtype).tobytes())
+			self.num_windows += len(arrivals)
+			f.seek(0)
+			f.write(self._header())
+
+	def window_range(self, start: float | None = None, end: float | None = None) -> Tuple[int, int]:
+		"""Rows of the windows whose start time lies in [start, end)."""
+		first = 0 if start is None else math.ceil((start - self.origin) / self.window_seconds)
+		last = self.num_windows if end is None else math.ceil((end - self.origin) / self.window_seconds)
+		first = min(max(first, 0), self.num_windows)
+		return first, min(max(last, first), self.num_windows)
+
+	def read(self, start: float | None = None, end: float | None = None) -> WindowedCounts:
+		"""Memory-map the windows in [start, end) without loading the file."""
+		first, last = self.window_range(start, end)
+		if self.num_windows == 0:
+			arrivals = np.zeros((0, self.num_steps), dtype=self.dtype)
+		else:
+			data = np.memmap(
+				self.path, dtype=self.dtype, mode="r", offset=COUNT_STORE_HEADER_SIZE,
+				shape=(self.num_windows, self.num_steps),
+			)
+			arrivals = data[first:last]
+		return WindowedCounts(arrivals, self.origin + np.arange(first, last) * self.window_seconds)
+
+
+def open_count_stores(directory: str, suffix: str = ".jmcounts") -> Dict[str, CountStore]:
+	"""Open every store in `directory`, keyed by flow name (file stem)."""
+	return {
+		name[:-len(suffix)]: CountStore.open(os.path.join(directory, name))
+		for name in sorted(os.listdir(directory))
+		if name.endswith(suffix)
+	}
+
+
+@dataclass
+class MultiResolutionRollup:
+	"""Keep A_i(t) at several window sizes by summing finer windows as they arrive.
+
+	`factors` are window sizes in multiples of the base window (for example
+	1m, 5m, 15m, 1h) and each must divide the next, so every level is built
+	by summing completed windows of the level below it; raw data is never
+	rescanned. Coarse windows are aligned to the first base window added.
+	`history` caps how many completed windows each level keeps.
+	"""
+	num_steps: int
+	window_seconds: float = 60.0
+	factors: Tuple[int, ...] = (1, 5, 15, 60)
+	history: int | None = None
+	_start: float | None = field(init=False, default=None)
+	_pending: List[np.ndarray] = field(init=False)
+	_done: List[List[np.ndarray]] = field(init=False)
+	_emitted: List[int] = field(init=False)
+
+	def __post_init__(self) -> None:
+		if self.factors[0] != 1 or any(b % a for a, b in zip(self.factors, self.factors[1:])):
+			raise ValueError("factors must start at 1 and each must divide the next")
+		empty = np.zeros((0, self.num_steps), dtype=np.int64)
+		self._pending = [empty for _ in self.factors]
+		self._done = [[] for _ in self.factors]
+		self._emitted = [0 for _ in self.factors]
+
+	def add(self, counts: WindowedCounts | np.ndarray) -> Dict[int, WindowedCounts]:
+		"""Add consecutive base windows; return newly completed windows per factor."""
+		arrivals = counts.arrivals if isinstance(counts, WindowedCounts) else np.asarray(counts)
+		if self._start is None:
+			has_start = isinstance(counts, WindowedCounts) and counts.window_start is not None and len(arrivals)
+			self._start = float(counts.window_start[0]) if has_start else 0.0
+		completed: Dict[int, WindowedCounts] = {}
+		rows = np.asarray(arrivals, dtype=np.int64)
+		for level, factor in enumerate(self.factors):
+			ratio = factor // self.factors[level - 1] if level else 1
+			rows = np.vstack([self._pending[level], rows])
+			full = len(rows) // ratio
+			self._pending[level] = rows[full * ratio:]
+			rows = rows[:full * ratio].reshape(full, ratio, self.num_steps).sum(axis=1)
+			starts = self._start + (self._emitted[level] + np.arange(full)) * factor * self.window_seconds
+			self._emitted[level] += full
+			completed[factor] = WindowedCounts(rows, starts)
+			if full:
+				self._done[level].append(rows)
+				if self.history is not None and sum(len(block) for block in self._done[level]) > 2 * self.history:
+					self._retained(level)
+		return completed
+
+	def _retained(self, level: int) -> np.ndarray:
+		"""Merge a level's blocks into one array, trimmed to `history`."""
+		blocks = self._done[level]
+		arrivals = np.vstack(blocks) if blocks else np.zeros((0, self.num_steps), dtype=np.int64)
+		if self.history is not None:
+			arrivals = arrivals[-self.history:]
+		self._done[level] = [arrivals] if len(arrivals) else []
+		return arrivals
+
+	def series(self, factor: int) -> WindowedCounts:
+		"""All retained completed windows at `factor` × the base window."""
+		level = self.factors.index(factor)
+		arrivals = self._retained(level)
+		first = self._emitted[level] - len(arrivals)
+		starts = (self._start or 0.0) + (first + np.arange(len(arrivals))) * factor * self.window_seconds
+		return WindowedCounts(arrivals, starts)
+
+	def control_limits(self, factor: int, stable_windows: int, k: float = 2.66) -> Tuple[float, float, float] | None:
+		"""Individuals-chart limits of C(t) at one resolution."""
+		return compute_individuals_control_limits(self.series(factor).conversion, stable_windows, k)
+
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def _escape_label(value: str) -> str:
+	return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_sample(value: float) -> str:
+	if math.isnan(value):
+		return "NaN"
+	if math.isinf(value):
+		return "+Inf" if value > 0 else "-Inf"
+	return repr(float(value))
+
+
+@dataclass
+class OpenMetricsExporter:
+	"""Serve the latest closed window of every flow in OpenMetrics text format.
+
+	Call `observe` with a flow's per-step arrivals whenever one of its
+	windows closes (e.g. with the output of `StepWindowAggregator.add`).
+	Each flow keeps a `RollingControlChart` on C(t); its samples are
+	formatted and the full exposition rebuilt under a lock when the window
+	closes, so a scrape (from any thread) only returns the current bytes.
+
+	Exposed gauges, labelled by `flow` (and `step`):
+	- `<prefix>_step_arrivals`: A_i(t)
+	- `<prefix>_transition_ratio`: T_i(t)
+	- `<prefix>_conversion`, `..._conversion_moving_average`: C(t) and its MA
+	- `<prefix>_conversion_ucl`, `..._conversion_lcl`: rolling limits
+	- `<prefix>_conversion_alert`: 1 while the MA is outside the limits
+	- `<prefix>_window_end_seconds`: end of the exported window, if known
+	"""
+	prefix: str = "journey"
+	ma_window: int = 5
+	lookback: int = 10
+	k: float = 2.66
+	_charts: Dict[str, RollingControlChart] = field(init=False, default_factory=dict, repr=False)
+	_samples: Dict[str, Dict[str, List[str]]] = field(init=False, default_factory=dict, repr=False)
+	_body: bytes = field(init=False, default=b"", repr=False)
+	_lock: threading.Lock = field(init=False, default_factory=threading.Lock, repr=False)
+
+	def __post_init__(self) -> None:
+		self._body = self._build()
+
+	def _families(self) -> List[Tuple[str, str]]:
+		return [
+			(f"{self.prefix}_step_arrivals", "Requests entering each step in the last closed window."),
+			(f"{self.prefix}_transition_ratio", "T_i = A_{i+1} / A_i in the last closed window."),
+			(f"{self.prefix}_conversion", "C = A_S / A_1 in the last closed window."),
+			(f"{self.prefix}_conversion_moving_average", "Moving average of C."),
+			(f"{self.prefix}_conversion_ucl", "Upper control limit of the C moving average."),
+			(f"{self.prefix}_conversion_lcl", "Lower control limit of the C moving average."),
+			(f"{self.prefix}_conversion_alert", "1 if the C moving average is outside its control limits."),
+			(f"{self.prefix}_window_end_seconds", "End time of the last closed window."),
+		]
+
+	def observe(
+		self,
+		flow: str,
+		arrivals: np.ndarray | WindowedCounts,
+		window_end: float | np.ndarray | None = None,
+		steps: List[str] | None = None,
+	) -> None:
+		"""Record closed windows of `flow` and export the last one.
+
+		`arrivals` is one window's per-step counts, a (windows × steps)
+		matrix of consecutive closed windows, or a `WindowedCounts`. Every
+		window updates the flow's control chart. `steps` names the step
+		label values (default "1", "2", ...).
+		"""
+		if isinstance(arrivals, WindowedCounts):
+			arrivals = arrivals.arrivals
+		counts = np.atleast_2d(np.asarray(arrivals))
+		if len(counts) == 0:
+			return
+		window_end = None if window_end is None else np.atleast_1d(np.asarray(window_end, dtype=float))[-1]
+		steps = steps or [str(i + 1) for i in range(counts.shape[1])]
+		if len(steps) != counts.shape[1]:
+			raise ValueError(f"Expected {counts.shape[1]} step names, got {len(steps)}")
+
+		with self._lock:
+			self._observe(flow, counts, window_end, steps)
+			self._body = self._build()
+
+	def _observe(self, flow: str, counts: np.ndarray, window_end: float | None, steps: List[str]) -> None:
+		chart = self._charts.get(flow)
+		if chart is None:
+			chart = self._charts[flow] = RollingControlChart(self.ma_window, self.lookback, self.k)
+		windowed = WindowedCounts(counts)
+		for C in windowed.conversion:
+			ma, _, ucl, lcl = chart.update(float(C))
+		A = counts[-1]
+		T = windowed.transitions[-1]
+		alert = float(ma > ucl or ma < lcl)
+
+		label = f"flow=\"{_escape_label(flow)}\""
+		step_labels = [f"{{{label},step=\"{_escape_label(step)}\"}}" for step in steps]
+		names = [name for name, _ in self._families()]
+		self._samples[flow] = {
+			names[0]: [f"{names[0]}{step_labels[i]} {int(A[i])}" for i in range(len(A))],
+			names[1]: [f"{names[1]}{step_labels[i]} {_format_sample(T[i])}" for i in range(len(T))],
+			names[2]: [f"{names[2]}{{{label}}} {_format_sample(windowed.conversion[-1])}"],
+			names[3]: [f"{names[3]}{{{label}}} {_format_sample(ma)}"],
+			names[4]: [f"{names[4]}{{{label}}} {_format_sample(ucl)}"],
+			names[5]: [f"{names[5]}{{{label}}} {_format_sample(lcl)}"],
+			names[6]: [f"{names[6]}{{{label}}} {_format_sample(alert)}"],
+			names[7]: [] if window_end is None else [f"{names[7]}{{{label}}} {_format_sample(window_end)}"],
+		}
+
+	def _build(self) -> bytes:
+		lines: List[str] = []
+		for name, help_text in self._families():
+			lines.append(f"# TYPE {name} gauge")
+			lines.append(f"# HELP {name} {help_text}")
+			for flow in self._samples.values():
+				lines.extend(flow[name])
+		lines.append("# EOF")
+		return ("\n".join(lines) + "\n").encode()
+
+	def render(self) -> bytes:
+		"""The current exposition, as built when the last window closed."""
+		return self._body
+
+	def serve(self, host: str = "127.0.0.1", port: int = 9464) -> ThreadingHTTPServer:
+		"""Serve `render()` at /metrics from a daemon thread.
+
+		Returns the running server; `server.server_address` has the bound
+		port (pass `port=0` to pick a free one) and `server.shutdown()`
+		stops it.
+		"""
+		exporter = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def do_GET(self) -> None:
+				if self.path.split("?", 1)[0] != "/metrics":
+					self.send_error(404)
+					return
+				body = exporter.render()
+				self.send_response(200)
+				self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format: str, *args) -> None:
+				pass
+
+		server = ThreadingHTTPServer((host, port), Handler)
+		threading.Thread(target=server.serve_forever, daemon=True).start()
+		return server
+
+
+@dataclass
+class JourneyCounter:
+	"""In-process A_i counters for request handlers: `journey.hit("otp")`.
+
+	Every thread increments its own plain list of integers (one slot per
+	step), so the hot path takes no lock and never contends. The lists
+	only grow; `roll` sums all of them and subtracts the previous totals,
+	which is safe without locking because each list has a single writer.
+	Lists of threads that have exited are folded into a retired total at
+	the next `roll` and dropped, so thread churn (e.g. a thread per
+	request) does not leak memory. Cost is one thread-local lookup, one
+	dict lookup and one list increment per hit; measured at 220-380 ns
+	per hit on CPython 3.11 across runs, which misses the 100 ns target.
+
+	`roll` closes the current window and returns it as `WindowedCounts`
+	(so T_i(t) and C(t) come for free) and passes it to every callable in
+	`sinks`, e.g. `MultiResolutionRollup.add` or a lambda around
+	`OpenMetricsExporter.observe`. `start` rolls on wall-clock window
+	boundaries from a daemon thread.
+	"""
+	steps: List[str]
+	window_seconds: float = 60.0
+	sinks: List[Callable[[WindowedCounts], object]] = field(default_factory=list)
+	clock: Callable[[], float] = time.time
+	_index: Dict[str, int] = field(init=False, repr=False)
+	_local: threading.local = field(init=False, repr=False)
+	_shards: List[Tuple[threading.Thread | None, List[int]]] = field(init=False, repr=False)
+	_retired: np.ndarray = field(init=False, repr=False)
+	_totals: np.ndarray = field(init=False, repr=False)
+	_window_start: float = field(init=False, repr=False)
+	_lock: threading.Lock = field(init=False, repr=False)
+	_stop: threading.Event = field(init=False, repr=False)
+
+	def __post_init__(self) -> None:
+		if self.window_seconds <= 0:
+			raise ValueError("window_seconds must be positive")
+		self._index = {step: i for i, step in enumerate(self.steps)}
+		if len(self._index) != len(self.steps):
+			raise ValueError("Step names must be unique")
+		self._local = threading.local()
+		self._shards = []
+		self._retired = np.zeros(len(self.steps), dtype=np.int64)
+		self._totals = np.zeros(len(self.steps), dtype=np.int64)
+		self._window_start = self.clock()
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+
+	def _new_shard(self, owner: threading.Thread | None = None) -> List[int]:
+		"""Register a shard written only by `owner` (None: never retired)."""
+		shard = [0] * len(self.steps)
+		with self._lock:
+			self._shards.append((owner, shard))
+		return shard
+
+	def hit(self, step: str, n: int = 1) -> None:
+		"""Count `n` requests entering `step` in the current window."""
+		try:
+			shard = self._local.shard
+		except AttributeError:
+			shard = self._local.shard = self._new_shard(threading.current_thread())
+		shard[self._index[step]] += n
+
+	def roll(self, now: float | None = None) -> WindowedCounts:
+		"""Close the current window at `now` (default: the clock) and emit it."""
+		now = self.clock() if now is None else now
+		with self._lock:
+			# A dead owner can no longer write, so its shard is final
+			dead = [shard for owner, shard in self._shards if owner is not None and not owner.is_alive()]
+			if dead:
+				self._retired = self._retired + np.array(dead, dtype=np.int64).sum(axis=0)
+				self._shards = [(owner, shard) for owner, shard in self._shards if owner is None or owner.is_alive()]
+			live = np.array([shard[:] for _, shard in self._shards], dtype=np.int64).reshape(-1, len(self.steps))
+			totals = self._retired + live.sum(axis=0)
+			counts = WindowedCounts((totals - self._totals)[None, :], np.array([self._window_start]))
+			self._totals = totals
+			self._window_start = now
+		for sink in self.sinks:
+			sink(counts)
+		return counts
+
+	def _next_boundary(self) -> float:
+		return (math.floor(self.clock() / self.window_seconds) + 1) * self.window_seconds
+
+	def start(self) -> threading.Thread:
+		"""Roll at every multiple of `window_seconds` until `stop` is called."""
+		def run() -> None:
+			while True:
+				boundary = self._next_boundary()
+				if self._stop.wait(max(0.0, boundary - self.clock())):
+					return
+				self.roll(boundary)
+
+		self._stop.clear()
+		thread = threading.Thread(target=run, daemon=True)
+		thread.start()
+		return thread
+
+	def stop(self) -> None:
+		self._stop.set()
+
+
+class AsyncJourneyCounter(JourneyCounter):
+	"""`JourneyCounter` for a single asyncio event loop.
+
+	All handlers share the loop's thread, so hits go to one list without a
+	thread-local lookup. The list has no owning thread and is never
+	retired, so the counter may be built outside the loop's thread. Run
+	`await counter.run()` as a task to roll on window boundaries.
+	"""
+
+	def __post_init__(self) -> None:
+		super().__post_init__()
+		self._shard = self._new_shard()
+
+	def hit(self, step: str, n: int = 1) -> None:
+		"""Count `n` requests entering `step` in the current window."""
+		self._shard[self._index[step]] += n
+
+	async def run(self) -> None:
+		"""Roll at every multiple of `window_seconds` until cancelled or `stop`."""
+		self._stop.clear()
+		while not self._stop.is_set():
+			boundary = self._next_boundary()
+			await asyncio.sleep(max(0.0, boundary - self.clock()))
+			self.roll(boundary)
+
+
+def _draw_delays(delay: float | Callable[[np.random.Generator, int], np.ndarray], rng: np.random.Generator, n: int) -> np.ndarray:
+	"""Draw `n` step delays: exponential with mean `delay`, or from a sampler."""
+	if callable(delay):
+		return np.asarray(delay(rng, n), dtype=float)
+	return rng.exponential(delay, n)
+
+
+def simulate_step_times(
+	num_users_per_minute: int | np.ndarray,
+	num_minutes: int,
+	p_success: float | List[float] = 0.9,
+	mean_delay: float | List[float | Callable] = 1.0,
+	rng: np.random.Generator | np.random.SeedSequence | int | None = None,
+	change_minute: float | None = None,
+	degraded: List[float] | None = None,
+) -> List[np.ndarray]:
+	"""Draw per-step arrival times (in minutes) for a user-level step chain.
+
+	Each minute `num_users_per_minute` users enter step 1 at uniform times;
+	pass an array with one count per minute for Poisson or seasonal traffic.
+	A user at step i reaches step i+1 with probability `p_success[i]` after
+	a delay from `mean_delay[i]`: a float is the mean of an exponential, a
+	callable `(rng, n) -> delays` samples any other distribution. Scalars
+	apply to a single transition. If `degraded` is given, users entering
+	step i at or after `change_minute` succeed with `degraded[i]` instead.
+	Returns one unsorted array of times per step; each step is drawn as a
+	whole array, so there is no per-user loop.
+	"""
+	rng = as_rng(rng)
+	p_list = [p_success] if np.isscalar(p_success) else list(p_success)
+	delays = list(mean_delay) if isinstance(mean_delay, (list, tuple)) else [mean_delay] * len(p_list)
+
+	times = np.repeat(np.arange(num_minutes, dtype=float), num_users_per_minute)
+	times += rng.random(len(times))
+	step_times = [times]
+	for i, p in enumerate(p_list):
+		if degraded is not None and change_minute is not None:
+			p = np.where(times >= change_minute, degraded[i], p)
+		times = times[rng.random(len(times)) < p]
+		times = times + _draw_delays(delays[i], rng, len(times))
+		step_times.append(times)
+	return step_times
+
+
+def simulate_windowed_counts(
+	num_users_per_minute: int,
+	num_minutes: int,
+	p_success: float | List[float] = 0.9,
+	mean_delay: float | List[float | Callable] = 1.0,
+	window_minutes: float = 1.0,
+	rng: np.random.Generator | np.random.SeedSequence | int | None = None,
+) -> WindowedCounts:
+	"""Simulate a step chain at user level and bucket arrivals into windows.
+
+	Event times come from `simulate_step_times` and are counted per window
+	with `np.bincount`, so cost is linear in events. Arrivals after
+	`num_minutes` are dropped; only full windows of `window_minutes` are
+	returned.
+	"""
+	step_times = simulate_step_times(num_users_per_minute, num_minutes, p_success, mean_delay, as_rng(rng))
+	num_windows = int(num_minutes / window_minutes)
+	arrivals = np.zeros((num_windows, len(step_times)), dtype=np.int64)
+	for step, times in enumerate(step_times):
+		bucket = np.floor(times / window_minutes).astype(np.int64)
+		arrivals[:, step] = np.bincount(bucket[bucket < num_windows], minlength=num_windows)
+	return WindowedCounts(arrivals, np.arange(num_windows) * window_minutes)
+
+
+def bucket_sorted_times(sorted_times: List[np.ndarray], window_minutes: float, num_minutes: float) -> WindowedCounts:
+	"""Re-bucket pre-sorted per-step event times into windows of any size.
+
+	Uses `np.searchsorted` on the window edges, so each call costs
+	O(windows · log events) instead of another pass over the events.
+	"""
+	num_windows = int(num_minutes / window_minutes)
+	edges = np.arange(num_windows + 1) * window_minutes
+	arrivals = np.column_stack([np.diff(np.searchsorted(times, edges)) for times in sorted_times])
+	return WindowedCounts(arrivals.astype(np.int64), edges[:-1])
+
+
+@dataclass
+class WindowSizeReport:
+	"""Noise and detection lag of T_i(t) / C(t) for one window size.
+
+	`T_variance` is the observed variance of each T_i(t) over the baseline
+	windows; `timing_variance` is what remains after subtracting the
+	binomial sampling variance p(1-p)/A_i, i.e. the part caused by journeys
+	straddling window boundaries. `detection_lag` is in minutes from the
+	change to the close of the first window flagged by an individuals
+	chart on C(t) (NaN if no change was injected or it was never flagged).
+	"""
+	window_minutes: float
+	baseline_windows: int
+	T_variance: np.ndarray
+	timing_variance: np.ndarray
+	detection_lag: float
+
+
+def advise_window_size(
+	num_users_per_minute: int,
+	num_minutes: int,
+	p_success: float | List[float],
+	mean_delay: float | List[float | Callable],
+	window_sizes: List[float] = (0.25, 0.5, 1, 2, 5, 10, 15, 30, 60),
+	change_minute: float | None = None,
+	degraded: List[float] | None = None,
+	warmup_minutes: float = 10.0,
+	k: float = 2.66,
+	rng: np.random.Generator | np.random.SeedSequence | int | None = None,
+) -> List[WindowSizeReport]:
+	"""Sweep window sizes over one simulated event stream.
+
+	The user-level stream is generated once, each step's times are sorted
+	once, and every window size is just a `bucket_sorted_times` call, so
+	the whole sweep costs about one simulation. Windows that start before
+	`warmup_minutes` (while later steps are still filling up) are ignored.
+	Baseline windows end before `change_minute`; if `degraded` transitions
+	are given they take effect at `change_minute` and the detection lag is
+	measured, using limits from `compute_individuals_control_limits`.
+	"""
+	p_list = [p_success] if np.isscalar(p_success) else list(p_success)
+	step_times = simulate_step_times(num_users_per_minute, num_minutes, p_list, mean_delay, rng, change_minute, degraded)
+	sorted_times = [np.sort(times) for times in step_times]
+	change_at = change_minute if degraded is not None and change_minute is not None else math.inf
+
+	reports: List[WindowSizeReport] = []
+	for window in window_sizes:
+		counts = bucket_sorted_times(sorted_times, window, num_minutes)
+		starts = counts.window_start
+		ends = starts + window
+		baseline = (starts >= warmup_minutes) & (ends <= change_at)
+		T = counts.transitions[baseline]
+		A = counts.arrivals[baseline, :-1].astype(float)
+		nan_row = np.full(len(p_list), np.nan)
+		if baseline.sum() < 2:
+			reports.append(WindowSizeReport(window, int(baseline.sum()), nan_row, nan_row, float("nan")))
+			continue
+		T_variance = np.nanvar(T, axis=0)
+		with np.errstate(divide="ignore"):
+			sampling_variance = np.nanmean(np.asarray(p_list) * (1 - np.asarray(p_list)) / A, axis=0)
+		timing_variance = np.maximum(T_variance - sampling_variance, 0.0)
+
+		lag = float("nan")
+		if change_at < math.inf:
+			C = counts.conversion
+			limits = compute_individuals_control_limits(C[baseline].tolist(), stable_windows=int(baseline.sum()), k=k)
+			if limits is not None:
+				_, ucl, lcl = limits
+				flagged = np.nonzero((ends > change_at) & ((C > ucl) | (C < lcl)))[0]
+				if len(flagged):
+					lag = float(ends[flagged[0]] - change_at)
+		reports.append(WindowSizeReport(window, int(baseline.sum()), T_variance, timing_variance, lag))
+	return reports
+
+
+def simulate_windowed_T(
+	num_users_per_minute: int,
+	num_minutes: int,
+	p_success: float = 0.9,
+	mean_delay: float = 1.0,
+	rng: np.random.Generator | np.random.SeedSequence | int | None = None,
+):
 	"""Simulate a single transition (Step 1 -> Step 2) in 1-minute windows.
 
 	Each minute we get `num_users_per_minute` new users entering step 1.
@@ -623,45 +2898,182 @@ def simulate_windowed_T(num_users_per_minute: int, num_minutes: int, p_success:
 	a random delay drawn from an exponential distribution with mean `mean_delay`.
 
 	We then count step-1 and step-2 arrivals per minute and return the measured
-	T1(t) = A2(t)/A1(t) time series.
-	"""
-	step1_times = []
-	step2_times = []
-
-	for minute in range(num_minutes):
-		for _ in range(num_users_per_minute):
-			# User enters step 1 at some point within this minute
-			t1 = minute + random.random()
-			step1_times.append(t1)
-			if random.random() < p_success:
-				# Exponential delay before reaching step 2
-				delay = random.expovariate(1.0 / mean_delay)
-				t2 = t1 + delay
-				step2_times.append(t2)
-
-	A1 = [0] * num_minutes
-	A2 = [0] * num_minutes
-
-	for t in step1_times:
-		m = int(t)
-		if 0 <= m < num_minutes:
-			A1[m] += 1
-
-	for t in step2_times:
-		m = int(t)
-		if 0 <= m < num_minutes:
-			A2[m] += 1
-
-	T_series = []
-	for m in range(num_minutes):
-		if A1[m] > 0:
-			# Cap at 1.0 since A2 can exceed A1 due to timing effects
-			# (users from previous windows completing in this window)
-			T_series.append(min(1.0, A2[m] / A1[m]))
-		else:
-			T_series.append(float("nan"))
+	T1(t) = A2(t)/A1(t) time series. See `simulate_windowed_counts` for other
+	window sizes and longer step chains. `rng` may be a Generator, seed or
+	`SeedSequence` child from `spawn_seeds`.
+	"""
+	counts = simulate_windowed_counts(num_users_per_minute, num_minutes, p_success, mean_delay, rng=rng)
+	# Cap at 1.0 since A2 can exceed A1 due to timing effects
+	# (users from previous windows completing in this window)
+	return np.minimum(1.0, counts.transitions[:, 0]).tolist()
+
+
+def exponential_lag_pmf(mean_delay: float, window: float, tail: float = 1e-3) -> np.ndarray:
+	"""P(a step's follow-up lands d windows later), d = 0, 1, ...
+
+	Assumes step-i requests arrive uniformly within their window and the
+	step i -> i+1 delay is exponential with mean `mean_delay` (same units
+	as `window`). With m = mean_delay / window,
+		P(lag < d) = 1 - m · e^{-d/m} · (e^{1/m} - 1)   for d ≥ 1,
+	and lags are kept until less than `tail` of the mass is left.
+	"""
+	m = mean_delay / window
+	if m <= 0:
+		return np.array([1.0])
+	max_lag = max(1, math.ceil(1 + m * math.log(max(m * math.expm1(1 / m), 1.0) / tail)))
+	d = np.arange(1, max_lag + 1)
+	below = np.concatenate([[0.0], 1.0 - m * np.exp(-d / m) * math.expm1(1 / m)])
+	pmf = np.diff(below)
+	return pmf / pmf.sum()
+
+
+def _nnls(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+	"""Non-negative least squares, min ||X c - y|| s.t. c ≥ 0 (Lawson-Hanson).
+
+	Meant for the handful of lag coefficients in `estimate_lag_pmf`; each
+	iteration is one small `lstsq` on the currently positive columns.
+	"""
+	n = X.shape[1]
+	positive = np.zeros(n, dtype=bool)
+	coef = np.zeros(n)
+	gradient = X.T @ (y - X @ coef)
+	tol = 1e-10 * max(np.abs(gradient).max(), 1.0)
+	for _ in range(3 * n):
+		if positive.all() or gradient[~positive].max() <= tol:
+			break
+		positive[np.argmax(np.where(positive, -np.inf, gradient))] = True
+		while True:
+			trial = np.zeros(n)
+			trial[positive] = np.linalg.lstsq(X[:, positive], y, rcond=None)[0]
+			if trial[positive].min() > 0:
+				coef = trial
+				break
+			# Step back to the boundary and drop the columns that hit zero
+			shrinking = positive & (trial <= 0)
+			alpha = np.min(coef[shrinking] / (coef[shrinking] - trial[shrinking]))
+			coef = coef + alpha * (trial - coef)
+			positive &= coef > 1e-12
+			coef[~positive] = 0.0
+		gradient = X.T @ (y - X @ coef)
+	return coef
+
+
+def estimate_lag_pmf(arrivals: np.ndarray, max_lag: int, max_condition: float = 1e6) -> np.ndarray:
+	"""Fit each transition's lag distribution from aggregate counts alone.
+
+	Non-negative least-squares fit of A_{i+1}(t) ≈ Σ_d c_d · A_i(t-d),
+	d = 0..max_lag, over a stable stretch of (windows × steps) `arrivals`;
+	c_d / Σc is the lag pmf (Σc itself estimates T_i). Returns
+	(steps-1 × max_lag+1).
+
+	The lags are only identifiable if step-i traffic varies from window to
+	window (Poisson noise is enough). If it is (nearly) constant the lagged
+	columns are collinear and any split of Σc fits equally well, so a
+	design whose condition number exceeds `max_condition` raises
+	ValueError; configure the pmf with `exponential_lag_pmf` instead.
+	"""
+	A = np.asarray(arrivals, dtype=float)
+	windows = len(A) - max_lag
+	if windows <= max_lag + 1:
+		raise ValueError("Need more windows than twice max_lag to estimate lags")
+	pmfs = np.zeros((A.shape[1] - 1, max_lag + 1))
+	for i in range(A.shape[1] - 1):
+		lagged = np.stack([A[max_lag - d:len(A) - d, i] for d in range(max_lag + 1)], axis=1)
+		norms = np.linalg.norm(lagged, axis=0)
+		if not np.all(norms > 0) or np.linalg.cond(lagged / norms) > max_condition:
+			raise ValueError(
+				f"Step {i + 1} traffic is too steady to identify transition {i + 1}'s lags; "
+				"use a stretch with varying volume or exponential_lag_pmf"
+			)
+		coef = _nnls(lagged, A[max_lag:, i + 1])
+		pmfs[i] = coef / coef.sum() if coef.sum() > 0 else np.eye(max_lag + 1)[0]
+	return pmfs
+
+
+def _lag_pmf_matrix(lag_pmf: np.ndarray | List[np.ndarray], transitions: int) -> np.ndarray:
+	"""Stack one pmf (shared) or one per transition into a zero-padded matrix."""
+	pmfs = [np.asarray(lag_pmf, dtype=float)] * transitions if np.ndim(lag_pmf[0]) == 0 else [np.asarray(p, dtype=float) for p in lag_pmf]
+	if len(pmfs) != transitions:
+		raise ValueError(f"Expected {transitions} lag distributions, got {len(pmfs)}")
+	matrix = np.zeros((transitions, max(len(p) for p in pmfs)))
+	for i, p in enumerate(pmfs):
+		matrix[i, :len(p)] = p
+	return matrix
+
+
+def lag_corrected_transitions(
+	arrivals: np.ndarray,
+	lag_pmf: np.ndarray | List[np.ndarray],
+	span: int = 1,
+) -> np.ndarray:
+	"""T_i(t) with the step i -> i+1 delay taken out.
+
+	A_{i+1}(t) counts follow-ups of step-i requests from this and earlier
+	windows, so instead of A_{i+1}(t) / A_i(t) we divide by the step-i
+	traffic expected to land in window t:
+		T̂_i(t) = A_{i+1}(t) / Σ_d w_i(d) · A_i(t - d),
+	with `lag_pmf` w_i from `exponential_lag_pmf` or `estimate_lag_pmf`
+	(one pmf shared by all transitions, or one per transition). This
+	removes the cohort mismatch that makes small windows jumpy; what is
+	left is count noise plus the randomness of individual delays. The gain
+	depends on how much step-i volume moves between windows: with exactly
+	constant arrivals the denominator equals A_i(t) and nothing changes.
+	With `span` > 1 numerator and denominator are summed over the last
+	`span` windows, which is a trailing sum and adds up to `span` - 1
+	windows of lag like any moving sum; it is still less noisy than the
+	uncorrected sum of the same span. The first windows without full
+	history are NaN.
+	"""
+	A = np.asarray(arrivals, dtype=float)
+	W = _lag_pmf_matrix(lag_pmf, A.shape[1] - 1)
+	lags = W.shape[1]
+	first = lags + span - 2  # First window with full history
+	numerator = np.full((len(A), W.shape[0]), np.nan)
+	expected = np.full((len(A), W.shape[0]), np.nan)
+	if len(A) > first:
+		lagged = sum(W[:, d] * A[lags - 1 - d:len(A) - d, :-1] for d in range(lags))
+		sums = np.cumsum(np.vstack([np.zeros((1, W.shape[0])), lagged]), axis=0)
+		expected[first:] = sums[span:] - sums[:-span]
+		sums = np.cumsum(np.vstack([np.zeros((1, W.shape[0])), A[lags - 1:, 1:]]), axis=0)
+		numerator[first:] = sums[span:] - sums[:-span]
+	with np.errstate(divide="ignore", invalid="ignore"):
+		return np.where(expected > 0, numerator / expected, np.nan)
+
+
+@dataclass
+class LagCorrectedTransitions:
+	"""Streaming `lag_corrected_transitions`: a ring buffer of recent A_i rows.
+
+	Keeps only the last len(lag_pmf) + span - 1 windows of per-step counts
+	(no per-user state), so each `update` is O(steps × lags × span).
+	"""
+	num_steps: int
+	lag_pmf: np.ndarray | List[np.ndarray]
+	span: int = 1
+	_weights: np.ndarray = field(init=False, repr=False)
+	_ring: np.ndarray = field(init=False, repr=False)
+	_seen: int = field(init=False, default=0)
+
+	def __post_init__(self) -> None:
+		self._weights = _lag_pmf_matrix(self.lag_pmf, self.num_steps - 1)
+		self._ring = np.zeros((self._weights.shape[1] + self.span - 1, self.num_steps))
+
+	def update(self, arrivals: np.ndarray) -> np.ndarray:
+		"""Add one closed window's A_i and return its lag-corrected T_i."""
+		size = len(self._ring)
+		slot = self._seen % size
+		self._ring[slot] = arrivals
+		self._seen += 1
+		if self._seen < size:
+			return np.full(self.num_steps - 1, np.nan)
+		# Row k of `recent` is the window k steps back
+		recent = self._ring[(slot - np.arange(size)) % size]
+		lags = self._weights.shape[1]
+		expected = sum(np.einsum("id,di->i", self._weights, recent[k:k + lags, :-1]) for k in range(self.span))
+		numerator = recent[:self.span, 1:].sum(axis=0)
+		with np.errstate(divide="ignore", invalid="ignore"):
+			return np.where(expected > 0, numerator / expected, np.nan)
 
-	return T_series
 
 def plot8_timing_noise(p_success: float, filename: str = "images/plot8.png") -> None:
 	"""Plot measured T1(t) in 1-minute windows at different volumes."""
@@ -727,8 +3139,124 @@ def plot_window_volume_consistency(filename: str = "images/plot13.png") -> None:
 	plt.close()
 
 
+@dataclass
+class PlotTask:
+	"""One figure of the report: a plot function, its arguments and a seed.
+
+	`content_hash` covers the arguments (scenario reprs, titles, filename),
+	the seed and the source of the plot function plus every module-level
+	function or class it reaches, so editing a title re-renders only that
+	figure while editing a simulator re-renders every figure that uses it.
+	"""
+	func: Callable
+	args: tuple = ()
+	kwargs: dict = field(default_factory=dict)
+	seed: int | None = None
+
+	@property
+	def filename(self) -> str:
+		bound = inspect.signature(self.func).bind(*self.args, **self.kwargs)
+		bound.apply_defaults()
+		return bound.arguments["filename"]
+
+	def task_seed(self) -> int:
+		"""Explicit seed, or a stable one derived from the output filename."""
+		return self.seed if self.seed is not None else zlib.crc32(self.filename.encode())
+
+	def content_hash(self) -> str:
+		digest = hashlib.sha256()
+		digest.update(repr((self.args, sorted(self.kwargs.items()), self.task_seed())).encode())
+		for source in _code_sources(self.func):
+			digest.update(source.encode())
+		return digest.hexdigest()
+
+
+def plot_task(func: Callable, *args, **kwargs) -> PlotTask:
+	"""Shorthand for `PlotTask(func, args, kwargs)`."""
+	return PlotTask(func, args, kwargs)
+
+
+def _code_sources(obj, seen: set | None = None) -> List[str]:
+	"""Source of `obj` and of the module-level functions, classes and constants it references.
+
+	Constants (any other non-module global) contribute `name = repr(value)`,
+	so changing e.g. `AUTO_SAMPLING_THRESHOLD` also invalidates the figures.
+	"""
+	seen = set() if seen is None else seen
+	if id(obj) in seen:
+		return []
+	seen.add(id(obj))
+	sources = [inspect.getsource(obj)]
+	codes = []
+	if inspect.isclass(obj):
+		codes = [member.__code__ for member in vars(obj).values() if inspect.isfunction(member)]
+	elif inspect.isfunction(obj):
+		codes = [obj.__code__]
+	names = set()
+	while codes:
+		code = codes.pop()
+		names.update(code.co_names)
+		codes.extend(const for const in code.co_consts if inspect.iscode(const))
+	# Scenario classes are often only reached through annotated parameters.
+	for annotation in getattr(obj, "__annotations__", {}).values():
+		names.update(a.__name__ for a in (annotation, *typing.get_args(annotation)) if isinstance(a, type))
+	module_globals = sys.modules[obj.__module__].__dict__
+	for name in sorted(names):
+		ref = module_globals.get(name)
+		if (inspect.isfunction(ref) or inspect.isclass(ref)) and getattr(ref, "__module__", None) == obj.__module__:
+			sources.extend(_code_sources(ref, seen))
+		elif name in module_globals and not callable(ref) and not inspect.ismodule(ref) and name not in seen:
+			seen.add(name)
+			# struct.Struct's repr is its address; its format is what matters
+			value = ref.format if isinstance(ref, struct.Struct) else ref
+			sources.append(f"{name} = {value!r}")
+	return sources
+
+
+def _render_task(task: PlotTask) -> str:
+	"""Worker entry point: render one task on the Agg backend with its seed."""
+	plt.switch_backend("Agg")
+	seed = task.task_seed()
+	random.seed(seed)
+	np.random.seed(seed)
+	task.func(*task.args, **task.kwargs)
+	return task.filename
+
+
+def render_plots(
+	tasks: List[PlotTask],
+	manifest_path: str = "images/.render_cache.json",
+	workers: int | None = None,
+	force: bool = False,
+) -> List[str]:
+	"""Render stale figures in parallel and skip the ones that are up to date.
+
+	A figure is up to date when its file exists and the manifest records
+	the task's current `content_hash`. Stale tasks run in a process pool
+	(`workers=1` renders inline). Returns the filenames that were rendered.
+	"""
+	manifest = {}
+	if not force and os.path.exists(manifest_path):
+		with open(manifest_path) as f:
+			manifest = json.load(f)
+	hashes = {task.filename: task.content_hash() for task in tasks}
+	stale = [task for task in tasks if force or not os.path.exists(task.filename) or manifest.get(task.filename) != hashes[task.filename]]
+
+	if workers == 1 or len(stale) <= 1:
+		rendered = [_render_task(task) for task in stale]
+	else:
+		with ProcessPoolExecutor(max_workers=workers) as pool:
+			rendered = list(pool.map(_render_task, stale))
+
+	manifest.update({filename: hashes[filename] for filename in rendered})
+	with open(manifest_path, "w") as f:
+		json.dump(manifest, f, indent=1, sort_keys=True)
+	return rendered
+
+
 if __name__ == "__main__":
 	os.makedirs("images", exist_ok=True)
+	tasks: List[PlotTask] = []
 
 	# Deterministic example flows
 	normal_scenario = FlowScenario(
@@ -745,11 +3273,11 @@ if __name__ == "__main__":
 		max_retries=0,
 	)
 	# Plots 1-5: FlowScenario comparisons
-	plot1_arrivals(normal_scenario, drop_scenario)
-	plot2_arrivals(normal_scenario, drop_scenario)
-	plot3_arrivals_comparison(normal_scenario, drop_scenario)
-	plot4_transition_ratios(normal_scenario, drop_scenario)
-	plot5_conversion(normal_scenario, drop_scenario)
+	tasks.append(plot_task(plot1_arrivals, normal_scenario, drop_scenario))
+	tasks.append(plot_task(plot2_arrivals, normal_scenario, drop_scenario))
+	tasks.append(plot_task(plot3_arrivals_comparison, normal_scenario, drop_scenario))
+	tasks.append(plot_task(plot4_transition_ratios, normal_scenario, drop_scenario))
+	tasks.append(plot_task(plot5_conversion, normal_scenario, drop_scenario))
 
 	# Simulations for time-series plots (C(t) with control limits)
 	base_transitions = [0.9, 0.9, 0.9, 1.0]
@@ -828,57 +3356,57 @@ if __name__ == "__main__":
 	)
 
 	# Generate C(t) control-chart examples (titles use plain ASCII only)
-	plot_C_with_limits(
+	tasks.append(plot_task(plot_C_with_limits,
 		sim_base_low,
 		filename="images/plot6.png",
 		title="C(t) with control limits - base, 100 requests/window",
-	)
-	plot_C_with_limits(
+	))
+	tasks.append(plot_task(plot_C_with_limits,
 		sim_base_mid,
 		filename="images/plot7.png",
 		title="C(t) with control limits - base, 10k requests/window",
-	)
-	plot_C_with_limits(
+	))
+	tasks.append(plot_task(plot_C_with_limits,
 		sim_base_high,
 		filename="images/plot14.png",
 		title="C(t) with control limits - base, 1M requests/window",
-	)
-	plot_C_with_limits(
+	))
+	tasks.append(plot_task(plot_C_with_limits,
 		sim_base_low_jitter,
 		filename="images/plot9.png",
 		title="C(t) with control limits - T=0.95, 100 requests/window, jitter 0.05",
-	)
-	plot_C_with_limits(
+	))
+	tasks.append(plot_task(plot_C_with_limits,
 		sim_base_high_jitter,
 		filename="images/plot10.png",
 		title="C(t) with control limits - T=0.95, 1M requests/window, jitter 0.05",
-	)
-	plot_C_with_limits(
+	))
+	tasks.append(plot_task(plot_C_with_limits,
 		sim_fail_low,
 		filename="images/plot11.png",
 		title="C(t) with control limits - T2 degrades 0.9->0.8, 100 requests/window",
 		highlight_test_phase=True,
-	)
-	plot_C_with_limits(
+	))
+	tasks.append(plot_task(plot_C_with_limits,
 		sim_fail_high,
 		filename="images/plot12.png",
 		title="C(t) with control limits - T2 degrades 0.9->0.8, 1M requests/window",
 		highlight_test_phase=True,
-	)
+	))
 
 	# Optional extra plots (not all are used in the README)
 	# Timing noise for a single transition T1(t)
-	plot8_timing_noise(p_success=normal_scenario.transitions[1])
+	tasks.append(plot_task(plot8_timing_noise, p_success=normal_scenario.transitions[1]))
 	# Per-step request volume consistency in one window
-	plot_window_volume_consistency()
+	tasks.append(plot_task(plot_window_volume_consistency))
 	
 	# Moving average control limits demo (solves jitter problem)
-	plot_C_with_moving_average_limits(
+	tasks.append(plot_task(plot_C_with_moving_average_limits,
 		sim_base_high_jitter,
 		ma_window=5,
 		filename="images/plot15.png",
 		title="C(t) with Moving Average Control Limits - solves jitter problem",
-	)
+	))
 	
 	# OAuth2 Device Flow Examples - Multiple scenarios with moving average limits
 	
@@ -901,12 +3429,12 @@ if __name__ == "__main__":
 		max_volume=10_000,
 		jitter=0.02,
 	)
-	plot_seasonal_volume_and_C(
+	tasks.append(plot_task(plot_seasonal_volume_and_C,
 		sim_oauth_seasonal_demo,
 		ma_window=5,
 		filename="images/plot15_5.png",
 		title="OAuth2: Volume changes 20×, C(t) remains stable",
-	)
+	))
 	
 	# Plot 16: User behavior change - T1 drops (verification URL)
 	oauth_t1_drop = FlowScenario(
@@ -923,13 +3451,13 @@ if __name__ == "__main__":
 		test_length=20,
 		jitter=0.02,
 	)
-	plot_C_with_moving_average_limits(
+	tasks.append(plot_task(plot_C_with_moving_average_limits,
 		sim_oauth_t1,
 		ma_window=5,
 		filename="images/plot16.png",
 		title="OAuth2: User behavior change (T1: 0.95→0.80)",
 		highlight_test_phase=True,
-	)
+	))
 	
 	# Plot 17: System behavior change with seasonal volume - T2 drops (authorization)
 	oauth_t2_drop = FlowScenario(
@@ -948,13 +3476,13 @@ if __name__ == "__main__":
 		max_volume=10_000, # Peak daytime traffic
 		jitter=0.02,
 	)
-	plot_seasonal_C_with_ma(
+	tasks.append(plot_task(plot_seasonal_C_with_ma,
 		sim_oauth_t2_seasonal,
 		ma_window=5,
 		filename="images/plot17.png",
 		title="OAuth2: System failure with seasonal traffic (T2: 0.85→0.70)",
 		highlight_test_phase=True,
-	)
+	))
 	
 	# Plot 18: Seasonal volume pattern only (no failure)
 	sim_oauth_seasonal = SeasonalSimulation(
@@ -967,12 +3495,12 @@ if __name__ == "__main__":
 		max_volume=10_000, # Peak daytime traffic
 		jitter=0.02,
 	)
-	plot_seasonal_C_with_ma(
+	tasks.append(plot_task(plot_seasonal_C_with_ma,
 		sim_oauth_seasonal,
 		ma_window=5,
 		filename="images/plot18.png",
 		title="OAuth2: Seasonal volume pattern (daily cycle)",
-	)
+	))
 	
 	# Plot 19: Polling infrastructure failure - T3 drops
 	oauth_t3_drop = FlowScenario(
@@ -989,13 +3517,13 @@ if __name__ == "__main__":
 		test_length=20,
 		jitter=0.02,
 	)
-	plot_C_with_moving_average_limits(
+	tasks.append(plot_task(plot_C_with_moving_average_limits,
 		sim_oauth_t3,
 		ma_window=5,
 		filename="images/plot19.png",
 		title="OAuth2: Polling infrastructure failure (T3: 0.98→0.85)",
 		highlight_test_phase=True,
-	)
+	))
 	
 	# Plot 20: Token validation issues - T4 drops
 	oauth_t4_drop = FlowScenario(
@@ -1012,10 +3540,13 @@ if __name__ == "__main__":
 		test_length=20,
 		jitter=0.02,
 	)
-	plot_C_with_moving_average_limits(
+	tasks.append(plot_task(plot_C_with_moving_average_limits,
 		sim_oauth_t4,
 		ma_window=5,
 		filename="images/plot20.png",
 		title="OAuth2: Token validation issues (T4: 0.99→0.90)",
 		highlight_test_phase=True,
-	)
+	))
+
+	rendered = render_plots(tasks, force="--force" in sys.argv)
+	print(f"Rendered {len(rendered)} of {len(tasks)} plots; the rest were up to date.")
@@ -0,0 +1,95 @@
+"""Tests for the OpenMetrics exporter and its /metrics endpoint."""
+import os
+import re
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import metrics_demo as md  # noqa: E402
+
+
+@pytest.fixture
+def exporter():
+	return md.OpenMetricsExporter()
+
+
+@pytest.fixture
+def server(exporter):
+	server = exporter.serve(port=0)
+	yield server
+	server.shutdown()
+	server.server_close()
+
+
+def scrape(server, path="/metrics"):
+	host, port = server.server_address[:2]
+	with urllib.request.urlopen(f"http://{host}:{port}{path}", timeout=5) as response:
+		return response.headers["Content-Type"], response.read().decode()
+
+
+def test_serve_exposes_flow_and_step_labels(exporter, server):
+	exporter.observe("login", [1000, 900, 810], window_end=60.0, steps=["start", "otp", "done"])
+	content_type, body = scrape(server)
+
+	assert content_type == md.OPENMETRICS_CONTENT_TYPE
+	assert body.endswith("# EOF\n")
+	assert body.count("# EOF") == 1
+	assert 'journey_step_arrivals{flow="login",step="start"} 1000' in body
+	assert 'journey_step_arrivals{flow="login",step="done"} 810' in body
+	assert re.search(r'^journey_transition_ratio\{flow="login",step="otp"\} 0\.9\b', body, re.M)
+	assert re.search(r'^journey_conversion\{flow="login"\} 0\.81\b', body, re.M)
+	assert re.search(r'^journey_window_end_seconds\{flow="login"\} 60(\.0)?$', body, re.M)
+
+
+def test_serve_before_any_window_has_only_metadata(server):
+	content_type, body = scrape(server)
+	assert content_type == md.OPENMETRICS_CONTENT_TYPE
+	assert body.endswith("# EOF\n")
+	assert all(line.startswith("#") for line in body.splitlines())
+
+
+def test_serve_rejects_other_paths(server):
+	with pytest.raises(urllib.error.HTTPError) as error:
+		scrape(server, "/")
+	assert error.value.code == 404
+
+
+def test_scrape_during_observe_sees_whole_windows(exporter, server):
+	# Every step of window w has w arrivals, so a scrape mixing two
+	# windows would show different values across the step lines. A new
+	# flow also appears with every window while scrapes are running.
+	windows = 300
+	done = threading.Event()
+
+	def observe():
+		for w in range(1, windows + 1):
+			exporter.observe("checkout", np.full(4, w), window_end=float(w))
+			exporter.observe("signup", np.full(3, w), window_end=float(w))
+			exporter.observe(f"campaign-{w}", np.full(2, w), window_end=float(w))
+		done.set()
+
+	writer = threading.Thread(target=observe)
+	writer.start()
+	scrapes = 0
+	while not done.is_set() or scrapes == 0:
+		_, body = scrape(server)
+		scrapes += 1
+		assert body.endswith("# EOF\n")
+		for flow in ("checkout", "signup"):
+			values = re.findall(rf'^journey_step_arrivals\{{flow="{flow}",step="\d+"\}} (\d+)$', body, re.M)
+			assert len(set(values)) <= 1
+			ends = re.findall(rf'^journey_window_end_seconds\{{flow="{flow}"\}} ([\d.]+)$', body, re.M)
+			if values:
+				assert float(ends[0]) == float(values[0])
+	writer.join()
+
+	_, body = scrape(server)
+	assert f'journey_step_arrivals{{flow="checkout",step="4"}} {windows}' in body
+	assert f'journey_step_arrivals{{flow="signup",step="3"}} {windows}' in body
+	assert body.count('journey_conversion{flow="campaign-') == windows